@@ -1,16 +1,62 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, Query
+import asyncio
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+from fastapi import BackgroundTasks, FastAPI, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
-from models.schemas import AnalyzeRequest, AnalyzeResponse
-from services.clip_search import query as clip_search_query
-from services.video_clip import get_clips
-from services.game_analyst import chat
+from api.static import AccelStaticFiles
+from models.schemas import (
+    AnalyzeRequest,
+    AnalyzeResponse,
+    ClipResponse,
+    ClipTimestamp,
+    DataQueryResult,
+    GameTimestamp,
+)
+from services.clip_search import (
+    query as clip_search_query,
+    clear_cache as clear_clip_search_cache,
+    preload as preload_clip_search,
+)
+from services.clip_search.cache import normalize_query
+from services.data import DATA_FILE
+from services.video_clip import get_clip, get_indexer, close_indexers
+from services.game_analyst import chat, chat_stream, preload as preload_game_analyst
+
+async def _warm_up():
+    """Pay the data load and index cache read before the first request does."""
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        loop.run_in_executor(CPU_POOL, preload_clip_search),
+        loop.run_in_executor(CPU_POOL, preload_game_analyst),
+        loop.run_in_executor(VIDEO_POOL, get_indexer, DEFAULT_VIDEO),
+        return_exceptions=True,
+    )
+    # A failed warm-up just means the first request pays for it
+    for r in results:
+        if isinstance(r, Exception):
+            print(f"Warm-up failed: {r}")
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    await _warm_up()
+    yield
+    close_indexers()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,10 +66,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.mount("/data", StaticFiles(directory="data"), name="data")
+# Behind nginx, set DATA_ACCEL_PREFIX (e.g. /_data) so nginx streams the video bytes
+_data_accel_prefix = os.getenv("DATA_ACCEL_PREFIX")
+if _data_accel_prefix:
+    app.mount("/data", AccelStaticFiles(directory="data", accel_prefix=_data_accel_prefix), name="data")
+else:
+    app.mount("/data", StaticFiles(directory="data"), name="data")
 
 DEFAULT_VIDEO = "data/49ers-Lions.mp4"
 
+# Dedicated pools so slow video work can't starve cheap query/chat requests.
+# Query/chat work is mostly waiting on LLM calls, so leave headroom over cpu_count.
+CPU_POOL = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="cpu")
+VIDEO_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="video")
+# Max concurrent clip lookups per request (each is a handful of Gemini round-trips)
+CLIP_CONCURRENCY = 4
+
+# Queries matching these are general analysis, not requests for specific plays
+GENERAL_KEYWORDS = [
+    "summarize", "summary", "overview", "recap", "analyze", "analysis",
+    "how did", "who won", "what happened", "tell me about", "explain",
+    "what was the score", "final score",
+]
+# One compiled alternation instead of a substring scan per keyword. Only the
+# leading edge is anchored so inflections ("explained", "recaps") still match.
+_GENERAL_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, GENERAL_KEYWORDS)) + ")", re.IGNORECASE)
+
+
+# Bumped whenever the video index changes so clip ETags go stale
+_index_generation = 0
+
+
+def _etag(*parts) -> str:
+    """Strong ETag over the request key plus the play-by-play file and index versions."""
+    version = f"{DATA_FILE.stat().st_mtime_ns}:{_index_generation}"
+    raw = "|".join([*map(str, parts), version])
+    return '"' + hashlib.blake2s(raw.encode(), digest_size=16).hexdigest() + '"'
+
+
+def _set_cache_headers(response: Response, etag: str):
+    # no-cache = always revalidate; a matching ETag costs a 304 and no backend work
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+
+# Searches currently running, keyed by normalized query, so concurrent
+# duplicates (e.g. everyone clicking the same suggestion) share one execution
+_inflight: dict[str, asyncio.Future] = {}
+
+
+async def _search_plays(q: str, key: str | None = None) -> DataQueryResult:
+    """Run clip_search_query on CPU_POOL, coalescing identical in-flight queries.
+
+    `key` is normalize_query(q); pass it if the caller already computed it.
+    """
+    key = key or normalize_query(q)
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.get_running_loop().run_in_executor(CPU_POOL, clip_search_query, q)
+        _inflight[key] = fut
+        fut.add_done_callback(lambda f: _inflight.pop(key, None) if _inflight.get(key) is f else None)
+    # shield: one client disconnecting must not cancel the shared search
+    return await asyncio.shield(fut)
+
+
+async def _gather_clips(timestamps: list[GameTimestamp], play_buffer_seconds: float) -> list[ClipTimestamp]:
+    """Resolve clips concurrently (bounded by CLIP_CONCURRENCY), preserving order."""
+    loop = asyncio.get_running_loop()
+    indexer = get_indexer(DEFAULT_VIDEO)
+    await loop.run_in_executor(VIDEO_POOL, indexer.ensure_indexed)
+
+    sem = asyncio.Semaphore(CLIP_CONCURRENCY)
+
+    async def one(ts: GameTimestamp) -> ClipTimestamp:
+        async with sem:
+            return await loop.run_in_executor(VIDEO_POOL, get_clip, DEFAULT_VIDEO, ts, play_buffer_seconds)
+
+    return list(await asyncio.gather(*(one(ts) for ts in timestamps)))
+
 
 @app.get("/")
 def hello_world():
@@ -31,68 +151,137 @@ def hello_world():
 
 
 @app.post("/analyze", response_model=AnalyzeResponse)
-def analyze(req: AnalyzeRequest):
+async def analyze(req: AnalyzeRequest):
+    loop = asyncio.get_running_loop()
+    # Strip once; _search_plays and the result cache share normalize_query for keys
+    query = req.query.strip()
+
     if req.mode == "video":
-        result = clip_search_query(req.query)
+        result = await _search_plays(query)
         clips = []
         if result.timestamps:
             buffer = req.play_buffer_seconds if req.play_buffer_seconds is not None else 15.0
-            clips = get_clips(DEFAULT_VIDEO, result.timestamps, play_buffer_seconds=buffer)
+            clips = await _gather_clips(result.timestamps, buffer)
         return AnalyzeResponse(mode="video", clips=clips)
 
     elif req.mode == "chat":
         session_id = req.session_id or "default"
-        response = chat(session_id, req.query, game_context=req.game_name)
 
         # Only suggest clips for play-specific queries, not general analysis
-        suggest_clips = False
-        query_lower = req.query.lower().strip()
-        general_keywords = [
-            "summarize", "summary", "overview", "recap", "analyze", "analysis",
-            "how did", "who won", "what happened", "tell me about", "explain",
-            "what was the score", "final score",
-        ]
-        is_general = any(kw in query_lower for kw in general_keywords)
-
-        if not is_general:
-            try:
-                clip_result = clip_search_query(req.query)
-                if clip_result.timestamps:
-                    suggest_clips = True
-            except Exception:
-                pass
+        is_general = _GENERAL_RE.search(query) is not None
+
+        # chat and clip search are independent — run them concurrently
+        chat_task = loop.run_in_executor(
+            CPU_POOL, partial(chat, session_id, query, game_context=req.game_name)
+        )
+        if is_general:
+            response = await chat_task
+            return AnalyzeResponse(mode="chat", response=response, suggest_clips=False)
+
+        response, clip_result = await asyncio.gather(
+            chat_task, _search_plays(query), return_exceptions=True
+        )
+        if isinstance(response, BaseException):
+            raise response
+
+        # A failed clip search just means no suggestion
+        suggest_clips = not isinstance(clip_result, BaseException) and bool(clip_result.timestamps)
 
         return AnalyzeResponse(mode="chat", response=response, suggest_clips=suggest_clips)
 
     return AnalyzeResponse(mode=req.mode, response="Unknown mode. Use 'chat' or 'video'.")
 
 
-@app.post("/index")
-def index_video(clear_cache: bool = Query(False, description="Clear existing cache before indexing")):
-    """Index the video to find quarter boundaries."""
-    from services.video_clip import VideoIndexer
+@app.post("/analyze/stream")
+def analyze_stream(req: AnalyzeRequest):
+    """Chat answer as server-sent events: one JSON-encoded text chunk per `data:` line."""
+    chunks = chat_stream(req.session_id or "default", req.query.strip(), game_context=req.game_name)
+    return StreamingResponse(
+        (f"data: {json.dumps(chunk)}\n\n" for chunk in chunks),
+        media_type="text/event-stream",
+    )
+
+
+@app.get("/query", response_model=DataQueryResult)
+async def query_plays(request: Request, response: Response, q: str):
+    """Game timestamps for plays matching a natural-language query."""
+    key = normalize_query(q)
+    etag = _etag("query", key)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    result = await _search_plays(q, key)
+    _set_cache_headers(response, etag)
+    return result
+
+
+@app.get("/clips", response_model=ClipResponse)
+async def get_video_clips(request: Request, response: Response, q: str, play_buffer_seconds: float = 15.0):
+    """Video clips for plays matching a natural-language query."""
+    key = normalize_query(q)
+    etag = _etag("clips", key, play_buffer_seconds)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    result = await _search_plays(q, key)
+    clips = []
+    if result.timestamps:
+        clips = await _gather_clips(result.timestamps, play_buffer_seconds)
+    _set_cache_headers(response, etag)
+    return ClipResponse(clips=clips)
 
-    indexer = VideoIndexer(DEFAULT_VIDEO)
+
+# Latest /index run, reported by GET /index/status
+_index_state: dict = {"status": "idle", "result": None, "error": None}
+
+
+@app.post("/index", status_code=202)
+async def index_video(
+    background_tasks: BackgroundTasks,
+    clear_cache: bool = Query(False, description="Clear existing cache before indexing"),
+):
+    """Schedule indexing of the video to find quarter boundaries. Poll /index/status."""
+    if _index_state["status"] == "running":
+        return {"status": "running"}
+
+    _index_state.update(status="running", result=None, error=None)
+    background_tasks.add_task(_index_in_background, clear_cache)
+    return {"status": "scheduled"}
+
+
+@app.get("/index/status")
+def index_status():
+    return _index_state
+
+
+async def _index_in_background(clear_cache: bool):
+    global _index_generation
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(VIDEO_POOL, _run_index, clear_cache)
+    except Exception as e:
+        print(f"Indexing failed: {e}")
+        _index_state.update(status="error", error=str(e))
+    else:
+        _index_state.update(status="done", result=result)
+    finally:
+        _index_generation += 1
+
+
+def _run_index(clear_cache: bool) -> dict:
+    indexer = get_indexer(DEFAULT_VIDEO)
 
     if clear_cache:
         print("Clearing all cached data...")
-        indexer.index.quarters = {}
-        indexer.index.mappings = {}
-        indexer.index.known_frames = {}
-        indexer.index.dead_zones = []
-        indexer.index.save()
+        indexer.index.clear()
+        clear_clip_search_cache()
 
     # Re-index if no quarters found (cleared or never indexed)
-    if not indexer.index.is_indexed:
-        print("Running auto-index to find quarter boundaries...")
-        indexer.auto_index()
+    indexer.ensure_indexed()
 
-    result = {
+    return {
         "video": DEFAULT_VIDEO,
         "quarters": indexer.index.quarters,
         "cached_mappings": len(indexer.index.mappings),
         "known_frames": len(indexer.index.known_frames)
     }
-
-    indexer.close()
-    return result
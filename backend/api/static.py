@@ -0,0 +1,39 @@
+"""Static file serving that can hand byte transfer off to a fronting nginx."""
+
+import os
+from urllib.parse import quote
+
+from fastapi import Response
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
+
+
+class AccelStaticFiles(StaticFiles):
+    """
+    StaticFiles that answers with an X-Accel-Redirect header instead of a body.
+
+    Starlette still resolves the path (404s) and answers conditional requests
+    with 304 itself, but nginx streams the file, including Range requests
+    from the video player, so no Python worker is tied up shovelling bytes. Pair with an `internal` nginx location whose
+    prefix matches `accel_prefix`.
+    """
+
+    def __init__(self, *, accel_prefix: str, **kwargs):
+        super().__init__(**kwargs)
+        self.accel_prefix = accel_prefix.rstrip("/")
+        # Looked-up paths are realpaths, so compare against the real directory
+        # (a relative or symlinked directory would otherwise give "../" paths)
+        self.real_directory = os.path.realpath(self.directory)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        # Built only for its ETag / Last-Modified headers; the file isn't opened
+        file_headers = FileResponse(full_path, status_code=status_code, stat_result=stat_result).headers
+        if self.is_not_modified(file_headers, Headers(scope=scope)):
+            return NotModifiedResponse(file_headers)
+        rel_path = os.path.relpath(full_path, self.real_directory)
+        return Response(
+            status_code=status_code,
+            headers={"X-Accel-Redirect": f"{self.accel_prefix}/{quote(rel_path)}"},
+        )
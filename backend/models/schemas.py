@@ -11,6 +11,7 @@ class ClipTimestamp(BaseModel):
     start_time: float  # seconds into the video
     end_time: float | None = None  # end of clip (for loop / display)
     video_path: str  # path to source video
+    video_url: str | None = None  # URL under the /data static mount; the browser seeks this directly
     description: str | None = None  # full play description text
     play_type: str | None = None
     down: int | None = None
@@ -1,126 +1,150 @@
 """clip_search — natural-language to filtered NFL play-by-play data."""
 
-import math
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 
 from models.schemas import DataQueryResult, GameTimestamp
-from services.data import load_data
-from .agent import parse_query
+from services.data import load_search_data
+from .agent import parse_query, _client
+from .cache import QueryCache
 from .filter import (
     apply_filters,
     apply_rank,
     apply_sequence,
     apply_drive_filter,
+    canonical_json,
     FilterCondition,
     FilterGroup,
     PlayQuery,
 )
 
 
-def _safe(val):
-    """Return None if value is NaN/NaT, else the value."""
-    if val is None:
-        return None
-    try:
-        if pd.isna(val):
-            return None
-    except (TypeError, ValueError):
-        pass
-    return val
-
-
-def _safe_int(val):
-    v = _safe(val)
-    if v is None:
-        return None
-    try:
-        return int(v)
-    except (TypeError, ValueError):
-        return None
-
-
-def _safe_float(val):
-    v = _safe(val)
-    if v is None:
-        return None
-    try:
-        f = float(v)
-        return None if math.isnan(f) or math.isinf(f) else f
-    except (TypeError, ValueError):
-        return None
-
-
-def _safe_str(val):
-    v = _safe(val)
-    return str(v) if v is not None else None
-
-
-def _safe_bool(val):
-    v = _safe(val)
-    if v is None:
-        return False
-    return bool(int(v))
-
-
-def _extract_play_data(row) -> dict:
-    """Extract key play-by-play fields from a DataFrame row."""
-    return {
-        "desc": _safe_str(row.get("desc")),
-        "play_type": _safe_str(row.get("play_type")),
-        "down": _safe_int(row.get("down")),
-        "ydstogo": _safe_int(row.get("ydstogo")),
-        "yards_gained": _safe_int(row.get("yards_gained")),
-        "posteam": _safe_str(row.get("posteam")),
-        "defteam": _safe_str(row.get("defteam")),
-        "posteam_score": _safe_int(row.get("posteam_score")),
-        "defteam_score": _safe_int(row.get("defteam_score")),
-        "passer_player_name": _safe_str(row.get("passer_player_name")),
-        "rusher_player_name": _safe_str(row.get("rusher_player_name")),
-        "receiver_player_name": _safe_str(row.get("receiver_player_name")),
-        "touchdown": _safe_bool(row.get("touchdown")),
-        "interception": _safe_bool(row.get("interception")),
-        "sack": _safe_bool(row.get("sack")),
-        "fumble": _safe_bool(row.get("fumble")),
-        "yardline_100": _safe_int(row.get("yardline_100")),
-        "wpa": _safe_float(row.get("wpa")),
-    }
-
-
-def _ts_from_row(row) -> GameTimestamp:
-    return GameTimestamp(
-        quarter=int(row["qtr"]),
-        time=str(row["time"]) if pd.notna(row["time"]) else "0:00",
-        play_data=_extract_play_data(row),
-    )
+# (play_data key, source column, kind) for the fields sent with each timestamp
+PLAY_FIELDS: list[tuple[str, str, str]] = [
+    ("desc", "desc", "str"),
+    ("play_type", "play_type", "str"),
+    ("down", "down", "int"),
+    ("ydstogo", "ydstogo", "int"),
+    ("yards_gained", "yards_gained", "int"),
+    ("posteam", "posteam", "str"),
+    ("defteam", "defteam", "str"),
+    ("posteam_score", "posteam_score", "int"),
+    ("defteam_score", "defteam_score", "int"),
+    ("passer_player_name", "passer_player_name", "str"),
+    ("rusher_player_name", "rusher_player_name", "str"),
+    ("receiver_player_name", "receiver_player_name", "str"),
+    ("touchdown", "touchdown", "bool"),
+    ("interception", "interception", "bool"),
+    ("sack", "sack", "bool"),
+    ("fumble", "fumble", "bool"),
+    ("yardline_100", "yardline_100", "int"),
+    ("wpa", "wpa", "float"),
+]
+# Every column _timestamps_from_frame reads
+OUTPUT_COLUMNS = ["qtr", "time", *dict.fromkeys(col for _, col, _ in PLAY_FIELDS)]
+
+
+def _column_values(df: pd.DataFrame, column: str, kind: str) -> list:
+    """Convert one column to a list of JSON-safe Python values (NaN/inf → None)."""
+    if column not in df.columns:
+        return [False if kind == "bool" else None] * len(df)
+    col = df[column]
+    if kind == "str":
+        return col.astype("string").to_numpy(dtype=object, na_value=None).tolist()
+    num = pd.to_numeric(col, errors="coerce").replace([np.inf, -np.inf], np.nan)
+    if kind == "float":
+        return num.to_numpy(dtype=object, na_value=None).tolist()
+    if kind == "bool":
+        return (np.trunc(num.fillna(0)) != 0).tolist()
+    return np.trunc(num).astype("Int64").to_numpy(dtype=object, na_value=None).tolist()
+
+
+def _timestamps_from_frame(df: pd.DataFrame) -> list[GameTimestamp]:
+    """Build GameTimestamps for every row, converting column-wise instead of per row."""
+    keys = [key for key, _, _ in PLAY_FIELDS]
+    columns = [_column_values(df, col, kind) for _, col, kind in PLAY_FIELDS]
+    records = [dict(zip(keys, values)) for values in zip(*columns)]
+    quarters = df["qtr"].astype(int).tolist()
+    times = df["time"].astype("string").fillna("0:00").tolist()
+    return [
+        GameTimestamp(quarter=q, time=t, play_data=p)
+        for q, t, p in zip(quarters, times, records)
+    ]
+
+
+def _timestamps_at(df: pd.DataFrame, spans: list[tuple[int, int]]) -> list[GameTimestamp]:
+    """Timestamps for the first play of each (start_iloc, end_iloc) span, gathered in one take."""
+    starts = np.fromiter((s for s, _ in spans), dtype=np.int64, count=len(spans))
+    return _timestamps_from_frame(df.take(starts))
+
+
+_results = QueryCache(maxsize=512)
+
+
+def preload() -> None:
+    """Load the play-by-play data and Anthropic SDK ahead of the first query."""
+    load_search_data()
+    _client()
+
+
+def clear_cache() -> None:
+    """Drop all cached query results."""
+    _results.clear()
+    _run_plan.cache_clear()
 
 
 def query(nl_query: str) -> DataQueryResult:
-    """Parse a natural-language query and return matching GameTimestamps."""
-    play_query = parse_query(nl_query)
-    df = load_data()
-    df = df.sort_values(["game_id", "play_id"]).reset_index(drop=True)
+    """Parse a natural-language query and return matching GameTimestamps.
+
+    Results are cached on the normalized query text; callers must not mutate
+    the returned object.
+    """
+    cached = _results.get(nl_query)
+    if cached is not None:
+        return cached
+
+    result = _run_query(nl_query)
+    _results.set(nl_query, result)
+    return result
+
+
+def _run_query(nl_query: str) -> DataQueryResult:
+    # Different phrasings often parse to the same plan; run each plan once
+    return _run_plan(canonical_json(parse_query(nl_query)))
+
+
+@lru_cache(maxsize=512)
+def _run_plan(plan_json: str) -> DataQueryResult:
+    play_query = PlayQuery.model_validate_json(plan_json)
+    # Already in (game_id, play_id) order; _in_play_order re-checks cheaply
+    df = load_search_data()
 
     timestamps: list[GameTimestamp] = []
 
     if play_query.type == "filter":
-        results = apply_filters(df, play_query.filters)
+        needed = OUTPUT_COLUMNS
+        if play_query.rank is not None:
+            needed = [*needed, play_query.rank.rank_column, *play_query.rank.group_by]
+        columns = [c for c in dict.fromkeys(needed) if c in df.columns]
+        results = apply_filters(df, play_query.filters, columns)
         if play_query.rank is not None:
             results = apply_rank(results, play_query.rank).reset_index(drop=True)
-        for _, row in results.iterrows():
-            timestamps.append(_ts_from_row(row))
+        timestamps.extend(_timestamps_from_frame(results))
 
     elif play_query.type == "sequence":
         if play_query.rank is not None:
-            df = apply_rank(df, play_query.rank).reset_index(drop=True)
+            # Back to play order so span ilocs index this frame
+            df = apply_rank(df, play_query.rank).sort_index().reset_index(drop=True)
         spans = apply_sequence(df, play_query.anchor, play_query.then or [])
-        for start_idx, end_idx in spans:
-            timestamps.append(_ts_from_row(df.iloc[start_idx]))
+        timestamps.extend(_timestamps_at(df, spans))
 
     elif play_query.type == "drive":
         if play_query.rank is not None:
-            df = apply_rank(df, play_query.rank).reset_index(drop=True)
+            # Back to play order so span ilocs index this frame
+            df = apply_rank(df, play_query.rank).sort_index().reset_index(drop=True)
         spans = apply_drive_filter(df, play_query.drive_filter)
-        for start_idx, end_idx in spans:
-            timestamps.append(_ts_from_row(df.iloc[start_idx]))
+        timestamps.extend(_timestamps_at(df, spans))
 
     return DataQueryResult(timestamps=timestamps)
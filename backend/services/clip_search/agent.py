@@ -1,196 +1,354 @@
-"""NL-to-filters agent: two-step LLM process using Claude."""
+"""NL-to-filters agent: one Claude call from query to PlayQuery."""
 
 from __future__ import annotations
 
 import json
 import os
+import threading
+import time
 
 import logging
-
-import anthropic
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Callable, TypeVar
 
 logger = logging.getLogger(__name__)
 
-from services.data import get_category_summary, get_columns_for_categories, CATEGORIES
-from .filter import (
-    FilterCondition,
-    FilterGroup,
-    PlayQuery,
-    SequenceStep,
-    RankFilter,
-    DriveFilter,
-    DrivePlayPosition,
-)
+from services.data import CATALOG_COLUMNS, get_column_catalog
+from .cache import QueryCache, query_signature
+from .filter import FilterCondition, FilterGroup, PlayQuery
+from .llm_cache import ResponseCache, response_key
 
-client = anthropic.Anthropic()  # uses ANTHROPIC_API_KEY env var
 MODEL = "claude-sonnet-4-20250514"
+# Tried first for parse_query; replies it gets wrong (or API errors) escalate
+# to MODEL. Overridable so a retired snapshot can be swapped without a deploy.
+FAST_MODEL = os.getenv("CLIP_SEARCH_FAST_MODEL", "claude-3-5-haiku-20241022")
+# Bump when the prompt changes so stale cached responses are not reused
+PROMPT_VERSION = "v6"
+# How often parse_queries checks whether a message batch has finished
+BATCH_POLL_SECONDS = 10
+
+_responses = ResponseCache()
+# Parsed PlayQuerys in memory, including near-duplicate phrasings; checked
+# before the disk cache and kept when clip search drops its results
+_plans = QueryCache(maxsize=1024)
+
+
+@lru_cache(maxsize=1)
+def _client():
+    """Anthropic client, created on first use: the SDK takes ~1s to import."""
+    import anthropic
+
+    return anthropic.Anthropic()  # uses ANTHROPIC_API_KEY env var
+
+T = TypeVar("T")
+
+
+# Claude calls in progress, keyed like the disk cache, so identical requests
+# arriving together share one call instead of each paying for it
+_inflight: dict[bytes, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _cached_reply(
+    step: str,
+    query: str,
+    parse: Callable[[str], T],
+    *,
+    models: tuple[str, ...] = (MODEL,),
+    vet: Callable[[T], None] | None = None,
+    **request,
+) -> T:
+    """Return parse(Claude's reply) for this step/query, from the on-disk cache when possible.
+
+    `models` are tried cheapest first; a reply that fails parse or `vet`
+    (which raises ValueError to reject) escalates to the next model.
+    """
+    key = response_key(MODEL, PROMPT_VERSION, step, query=query)
+    text = _responses.get(key)
+    if text is not None:
+        return parse(text)
+
+    with _inflight_lock:
+        fut = _inflight.get(key)
+        leader = fut is None
+        if leader:
+            fut = _inflight[key] = Future()
+    if not leader:
+        return parse(fut.result())
+
+    try:
+        text, result = _first_accepted_reply(models, request, parse, vet)
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    else:
+        # Only cache replies that parsed
+        _responses.set(key, text)
+        fut.set_result(text)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _first_accepted_reply(models, request, parse, vet) -> tuple[str, T]:
+    import anthropic
+
+    for model in models[:-1]:
+        try:
+            text = _request_json_text(model, request)
+            result = parse(text)
+            if vet is not None:
+                vet(result)
+            return text, result
+        except ValueError as e:
+            logger.info("%s reply rejected, escalating: %s", model, e)
+        except anthropic.APIError as e:
+            # Overloaded, rate limited, retired model, timeout, ...: the next model may still answer
+            logger.warning("%s request failed, escalating: %s", model, e)
+    text = _request_json_text(models[-1], request)
+    return text, parse(text)
+
+
+def _request_json_text(model: str, request: dict) -> str:
+    """Call Claude and return the JSON arguments of its (forced) tool call."""
+    response = _client().messages.create(model=model, **request)
+    return _tool_input_json(response.content)
+
+
+def _tool_input_json(content) -> str:
+    for block in content:
+        if block.type == "tool_use":
+            return json.dumps(block.input)
+    # ValueError so _first_accepted_reply escalates to the next model
+    raise ValueError("reply has no tool call")
+
+
+# ── Parse query into PlayQuery ──────────────────────────────────────────────
+
+# Fixed instructions plus the full column catalog. Sent as a cached prompt
+# prefix, so keep anything query-specific out of it.
+_PLAY_QUERY_INSTRUCTIONS = (
+    "Convert the NFL query into a filter over a pandas DataFrame of play-by-play data "
+    "by calling filter_plays.\n\n"
+    "Condition: {\"column\": str, \"operator\": op, \"value\": str|int|float|list|null}\n"
+    "Group: {\"logic\": \"and\"|\"or\", \"conditions\": [Condition|Group, ...]}\n\n"
+    "Pick one type (any type may add \"rank\"):\n"
+    '- filter, individual plays: {"type": "filter", "filters": Group}\n'
+    '- sequence, play A then event B: {"type": "sequence", "anchor": Group, '
+    '"then": [{"scope": "next_play"|"same_drive"|"next_drive", "filters": Group}]}\n'
+    "  next_play = the very next play in the drive; same_drive = any later play in the drive; "
+    "next_drive = any play in the following drive\n"
+    '- drive, whole drives (e.g. no penalties, ended in FG): {"type": "drive", "drive_filter": {'
+    '"include": Group, "include_min_count": int, "exclude": Group, '
+    '"play_at": {"position": int, "filters": Group}}}\n'
+    "  include: >= include_min_count plays match (default 1; \"3+ first downs\" → 3); "
+    "exclude: no play matches; play_at: the Nth play (1-indexed) matches, "
+    "e.g. started with a rush → position=1, play_type=run; second play was a pass → position=2, play_type=pass\n\n"
+    'rank: {"group_by": [col], "rank_column": col, "rank_order": "asc"|"desc", "rank": int, "top_n": int|null}\n'
+    "- rank=N → only the Nth item (\"first touchdown\" → rank=1, \"second sack\" → rank=2)\n"
+    "- top_n=N → the first N items, overrides rank. \"first/last N <things>\" ALWAYS uses top_n=N, never rank=N\n"
+    "- longest drive → drive_time_of_possession desc, rank=1\n"
+    "- first drive of each quarter → group_by=[drive_quarter_start], drive asc\n"
+    "- first sack → type=filter, play_id asc, rank=1; first 2 touchdowns → play_id asc, top_n=2; "
+    "last 3 plays → play_id desc, top_n=3; top 5 longest plays → yards_gained desc, top_n=5\n\n"
+    "op: eq neq gt lt gte lte contains not_contains isin\n"
+    "Conventions: binary columns (touchdown, sack, fumble, ...) eq 1|0; players F.Last (P.Mahomes); "
+    "teams KC BUF SF PHI DAL DET ...; qtr 1-5 (5=OT); "
+    "play_type: pass run punt kickoff field_goal no_play qb_kneel qb_spike; "
+    "text search on desc: contains keyword\n\n"
+    "Available columns, grouped by category:\n" + get_column_catalog()
+)
 
 
-# ── Step 1: select relevant categories ──────────────────────────────────────
+# Structured output: Claude must answer with a filter_plays call whose input
+# follows the PlayQuery schema, so there is no free-form JSON to clean up
+_PLAY_QUERY_TOOL = {
+    "name": "filter_plays",
+    "description": "Select plays, sequences of plays, or drives from the play-by-play data.",
+    "input_schema": PlayQuery.model_json_schema(),
+}
 
-def select_categories(query: str) -> list[str]:
-    """Ask Claude which column categories are relevant to the user's query."""
-    category_summary = get_category_summary()
-    all_names = [c.name for c in CATEGORIES]
 
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=256,
+def _play_query_request(query: str) -> dict:
+    """messages.create arguments (minus model) for parsing one query."""
+    return dict(
+        max_tokens=2048,
+        tools=[_PLAY_QUERY_TOOL],
+        tool_choice={"type": "tool", "name": "filter_plays"},
         messages=[
             {
                 "role": "user",
-                "content": (
-                    "You are helping filter NFL play-by-play data. "
-                    "Given the user's query, return a JSON list of category names "
-                    "that contain columns relevant to answering it. "
-                    "Return ONLY a JSON array of strings, nothing else.\n\n"
-                    f"Available categories:\n{category_summary}\n\n"
-                    f"User query: {query}"
-                ),
+                "content": [
+                    # Static prefix first so Anthropic's prompt cache can reuse it
+                    {
+                        "type": "text",
+                        "text": _PLAY_QUERY_INSTRUCTIONS,
+                        "cache_control": {"type": "ephemeral"},
+                    },
+                    {"type": "text", "text": f"Query: {query}"},
+                ],
             }
         ],
     )
 
-    text = response.content[0].text.strip()
-    # Strip markdown code fences if present
-    if text.startswith("```"):
-        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-    names = json.loads(text)
-    # Validate
-    return [n for n in names if n in {c.name for c in CATEGORIES}]
+
+# ── Fast path: common one-event queries answered without Claude ────────────
+
+def _flag(column: str) -> FilterCondition:
+    return FilterCondition(column=column, operator="eq", value=1)
+
+
+def _play_type(value: str) -> FilterCondition:
+    return FilterCondition(column="play_type", operator="eq", value=value)
+
+
+# query_signature tokens → (condition, team column or None if a team makes it ambiguous)
+_FAST_EVENTS: dict[tuple[str, ...], tuple[FilterCondition, str | None]] = {
+    ("touchdown",): (_flag("touchdown"), "td_team"),
+    ("sack",): (_flag("sack"), None),
+    ("interception",): (_flag("interception"), None),
+    ("fumble",): (_flag("fumble"), None),
+    ("penalty",): (_flag("penalty"), "penalty_team"),
+    ("first", "down"): (_flag("first_down"), "posteam"),
+    ("field", "goal"): (_play_type("field_goal"), "posteam"),
+    ("punt",): (_play_type("punt"), "posteam"),
+    ("pass",): (_play_type("pass"), "posteam"),
+    ("pass", "play"): (_play_type("pass"), "posteam"),
+    ("run",): (_play_type("run"), "posteam"),
+    ("run", "play"): (_play_type("run"), "posteam"),
+    ("rush",): (_play_type("run"), "posteam"),
+    ("rush", "play"): (_play_type("run"), "posteam"),
+}
+_FAST_TEAMS = {
+    "sf": "SF", "49er": "SF", "niner": "SF",
+    "det": "DET", "lion": "DET", "detroit": "DET",
+}
+
+
+def _fast_path(query: str) -> PlayQuery | None:
+    """Hand-built PlayQuery for "[team] <event>" queries, else None."""
+    sig = query_signature(query)
+    team = _FAST_TEAMS.get(sig[0]) if sig else None
+    event = _FAST_EVENTS.get(sig[1:] if team else sig)
+    if event is None:
+        return None
+    condition, team_column = event
+    conditions = [condition]
+    if team:
+        if team_column is None:
+            return None
+        conditions.append(FilterCondition(column=team_column, operator="eq", value=team))
+    return PlayQuery(type="filter", filters=FilterGroup(logic="and", conditions=conditions))
+
+
+def _columns_used(q: PlayQuery) -> set[str]:
+    groups = [q.filters, q.anchor, *(step.filters for step in q.then or [])]
+    if q.drive_filter is not None:
+        d = q.drive_filter
+        groups += [d.include, d.exclude, d.play_at.filters if d.play_at else None]
+    cols = set()
+    while groups:
+        g = groups.pop()
+        if g is None:
+            continue
+        for item in g.conditions:
+            if isinstance(item, FilterGroup):
+                groups.append(item)
+            else:
+                cols.add(item.column)
+    if q.rank is not None:
+        cols.add(q.rank.rank_column)
+        cols.update(q.rank.group_by)
+    return cols
 
 
-# ── Step 2: parse query into PlayQuery ──────────────────────────────────────
+def _vet_columns(q: PlayQuery) -> None:
+    unknown = _columns_used(q) - CATALOG_COLUMNS
+    if unknown:
+        raise ValueError(f"unknown columns {sorted(unknown)}")
+
 
 def parse_query(query: str) -> PlayQuery:
-    """Convert a natural-language query into a structured PlayQuery."""
-    categories = select_categories(query)
-    columns = get_columns_for_categories(categories)
+    """Convert a natural-language query into a structured PlayQuery.
 
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=2048,
-        messages=[
-            {
-                "role": "user",
-                "content": (
-                    "You are converting a natural-language NFL query into a structured JSON object "
-                    "for filtering a pandas DataFrame of play-by-play data.\n\n"
-                    "Available columns:\n" + ", ".join(columns) + "\n\n"
-                    "Return a JSON object with this top-level schema (no other text):\n"
-                    "{\n"
-                    '  "type": "filter" | "sequence" | "drive",\n'
-                    '  // include the relevant fields for the chosen type (see below)\n'
-                    '  "rank": { ... } // optional pre-filter\n'
-                    "}\n\n"
-                    '## Type "filter" — single play matching\n'
-                    "Use for queries about individual plays.\n"
-                    '{"type": "filter", "filters": {"logic": "and", "conditions": [...]}}\n\n'
-                    '## Type "sequence" — play A followed by play B\n'
-                    "Use when the query describes a play followed by another event (in same drive or next drive).\n"
-                    '{"type": "sequence",\n'
-                    ' "anchor": {"logic": "and", "conditions": [...]},\n'
-                    ' "then": [{"scope": "same_drive"|"next_play"|"next_drive", '
-                    '"filters": {"logic": "and", "conditions": [...]}}]}\n\n'
-                    "Scope values:\n"
-                    '- "next_play": exactly the next play in the drive\n'
-                    '- "same_drive": any later play in the same drive\n'
-                    '- "next_drive": any play in the immediately following drive\n\n'
-                    '## Type "drive" — entire drives matching criteria\n'
-                    "Use for queries about drives (e.g. drives with no penalties, drives ending in FG).\n"
-                    '{"type": "drive", "drive_filter": {\n'
-                    '  "include": {"logic": "and", "conditions": [...]},  // at least one play matches\n'
-                    '  "include_min_count": 1,  // default 1; set higher for "3+ first downs"\n'
-                    '  "exclude": {"logic": "and", "conditions": [...]}   // NO play in drive matches\n'
-                    '  "play_at": {"position": 1, "filters": {...}}  // Nth play of drive must match (1-indexed)\n'
-                    "}}\n"
-                    "play_at examples: drive started with a rush → position=1, play_type=run. "
-                    "Second play was a pass → position=2, play_type=pass.\n\n"
-                    '## Optional "rank" — limit results by ordering\n'
-                    '{"rank": {"group_by": [...], "rank_column": "...", '
-                    '"rank_order": "asc"|"desc", "rank": 1, "top_n": null}}\n\n'
-                    'IMPORTANT — "rank" vs "top_n":\n'
-                    '- "rank" (int): return ONLY the Nth item. "first touchdown" → rank=1. "second sack" → rank=2.\n'
-                    '- "top_n" (int or null): return the first N items. "first 2 touchdowns" → top_n=2. "top 5 longest plays" → top_n=5.\n'
-                    "  When top_n is set, rank is ignored.\n"
-                    '- If the user says "first/last N <things>", ALWAYS use top_n=N, NOT rank=N.\n'
-                    "Examples:\n"
-                    "- Longest drive → rank_column=drive_time_of_possession, rank_order=desc, rank=1\n"
-                    "- First drive of each quarter → group_by=[drive_quarter_start], rank_column=drive, rank_order=asc\n"
-                    "- First sack of the game → use type=filter with rank on play_id asc, rank=1\n"
-                    "- First 2 touchdowns → use type=filter with rank on play_id asc, top_n=2\n"
-                    "- Last 3 plays → rank on play_id desc, top_n=3\n\n"
-                    "Condition operators: eq, neq, gt, lt, gte, lte, contains, not_contains, isin\n\n"
-                    "Key conventions:\n"
-                    "- Binary columns (touchdown, sack, fumble, etc.) use eq 1 or eq 0\n"
-                    "- Player names are like 'P.Mahomes', 'T.Kelce' (first initial dot last name)\n"
-                    "- Team abbreviations: KC, BUF, SF, PHI, DAL, DET, etc.\n"
-                    "- qtr is 1-5 (5 = OT)\n"
-                    "- play_type values: pass, run, punt, kickoff, field_goal, no_play, qb_kneel, qb_spike\n"
-                    "- For text search on 'desc' column, use 'contains' with a keyword\n\n"
-                    f"Query: {query}"
-                ),
-            }
-        ],
+    Callers must not mutate the result: it is shared through the plan cache.
+    """
+    play_query = _fast_path(query)
+    if play_query is not None:
+        return play_query
+
+    play_query = _plans.get(query)
+    if play_query is not None:
+        return play_query
+
+    play_query = _cached_reply(
+        "play_query",
+        query,
+        # JSON decoding and validation in one pass inside pydantic-core
+        PlayQuery.model_validate_json,
+        models=(FAST_MODEL, MODEL),
+        vet=_vet_columns,
+        **_play_query_request(query),
     )
+    logger.info(f"LLM output: {play_query}")
+    _plans.set(query, play_query)
+    return play_query
+
+
+def parse_queries(queries: list[str], timeout: float | None = None) -> list[PlayQuery]:
+    """Parse many queries at once through the Message Batches API.
+
+    For bulk jobs (cache warming, offline evaluation) where half-price
+    tokens matter more than latency — a batch can take minutes. Queries the
+    fast path or a cache answers skip the batch; any that fail in it fall
+    back to parse_query. If the batch hasn't ended after `timeout` seconds
+    it is cancelled and TimeoutError is raised.
+    """
+    results: list[PlayQuery | None] = [None] * len(queries)
+    pending: dict[str, int] = {}
+    for i, q in enumerate(queries):
+        results[i] = _fast_path(q) or _plans.get(q)
+        if results[i] is not None:
+            continue
+        key = response_key(MODEL, PROMPT_VERSION, "play_query", query=q)
+        text = _responses.get(key)
+        if text is not None:
+            results[i] = PlayQuery.model_validate_json(text)
+        elif key.hex() not in pending:
+            pending[key.hex()] = i
 
-    text = response.content[0].text.strip()
-    if text.startswith("```"):
-        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-    raw = json.loads(text)
-    logger.info(f"LLM output: {raw}")
-    return _parse_play_query(raw)
-
-
-def _parse_filter_group(data: dict) -> FilterGroup:
-    """Recursively parse a raw dict into FilterGroup/FilterCondition."""
-    conditions = []
-    for item in data["conditions"]:
-        if "conditions" in item:
-            conditions.append(_parse_filter_group(item))
-        else:
-            conditions.append(FilterCondition(**item))
-    return FilterGroup(logic=data["logic"], conditions=conditions)
-
-
-def _parse_play_query(data: dict) -> PlayQuery:
-    """Parse raw LLM JSON into a PlayQuery."""
-    q = PlayQuery(type=data["type"])
-
-    if data.get("filters"):
-        q.filters = _parse_filter_group(data["filters"])
-
-    if data.get("anchor"):
-        q.anchor = _parse_filter_group(data["anchor"])
-
-    if data.get("then"):
-        q.then = [
-            SequenceStep(
-                scope=s["scope"],
-                filters=_parse_filter_group(s["filters"]),
-            )
-            for s in data["then"]
-        ]
-
-    if data.get("drive_filter"):
-        df_raw = data["drive_filter"]
-        q.drive_filter = DriveFilter(
-            include=_parse_filter_group(df_raw["include"]) if df_raw.get("include") else None,
-            include_min_count=df_raw.get("include_min_count", 1),
-            exclude=_parse_filter_group(df_raw["exclude"]) if df_raw.get("exclude") else None,
-            play_at=DrivePlayPosition(
-                position=df_raw["play_at"]["position"],
-                filters=_parse_filter_group(df_raw["play_at"]["filters"]),
-            ) if df_raw.get("play_at") else None,
+    if pending:
+        batch = _client().messages.batches.create(
+            requests=[
+                {"custom_id": cid, "params": {"model": MODEL, **_play_query_request(queries[i])}}
+                for cid, i in pending.items()
+            ]
         )
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while batch.processing_status != "ended":
+            if deadline is not None and time.monotonic() >= deadline:
+                _client().messages.batches.cancel(batch.id)
+                raise TimeoutError(f"message batch {batch.id} not done after {timeout}s (cancelled)")
+            wait = BATCH_POLL_SECONDS if deadline is None else min(BATCH_POLL_SECONDS, deadline - time.monotonic())
+            time.sleep(max(wait, 0))
+            batch = _client().messages.batches.retrieve(batch.id)
 
-    if data.get("rank"):
-        q.rank = RankFilter(**data["rank"])
+        for entry in _client().messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                continue
+            try:
+                text = _tool_input_json(entry.result.message.content)
+                play_query = PlayQuery.model_validate_json(text)
+            except ValueError:
+                continue
+            _responses.set(bytes.fromhex(entry.custom_id), text)
+            _plans.set(queries[pending[entry.custom_id]], play_query)
+            results[pending[entry.custom_id]] = play_query
 
-    return q
+    for i, q in enumerate(queries):
+        if results[i] is None:
+            # Duplicate of a batched query (now cached) or a batch failure
+            results[i] = parse_query(q)
+    return results
@@ -0,0 +1,93 @@
+"""In-process LRU cache for natural-language query results."""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any
+
+# Filler words that don't change which plays a query selects
+_STOPWORDS = frozenset({
+    "a", "an", "the", "me", "us", "show", "find", "give", "get", "list",
+    "please", "all", "every", "can", "you", "i", "want", "to", "see",
+})
+_SYNONYMS = {"td": "touchdown", "int": "interception", "pick": "interception"}
+_TOKEN_RE = re.compile(r"[a-z0-9.']+")
+
+
+def normalize_query(q: str) -> str:
+    """Exact-match key: casefolded, whitespace collapsed, trailing punctuation dropped."""
+    return " ".join(q.casefold().split()).rstrip("?.! ")
+
+
+def query_signature(q: str) -> tuple[str, ...]:
+    """Looser key for near-duplicate phrasings.
+
+    Drops filler words, folds plurals to the singular word and a few abbreviations, but keeps
+    word order so "sack then touchdown" and "touchdown then sack" stay distinct.
+    """
+    tokens = []
+    for tok in _TOKEN_RE.findall(q.casefold()):
+        tok = tok.removesuffix("'s").strip(".'")
+        if not tok or tok in _STOPWORDS:
+            continue
+        if len(tok) > 4 and tok.endswith("ies"):
+            tok = tok[:-3] + "y"  # penalties
+        elif tok.endswith(("sses", "shes", "ches", "xes")):
+            tok = tok[:-2]  # passes, rushes, catches
+        elif len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        elif tok.endswith("s") and tok[:-1] in _SYNONYMS:
+            tok = tok[:-1]
+        tokens.append(_SYNONYMS.get(tok, tok))
+    return tuple(tokens)
+
+
+class QueryCache:
+    """Thread-safe LRU cache with an exact tier and a near-duplicate tier.
+
+    Lookups try the normalized text, then the ordered signature. There is no
+    order-insensitive tier: "passes that were not touchdowns" and "touchdowns
+    that were not passes" share every word but select different plays.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._exact: OrderedDict[str, Any] = OrderedDict()
+        self._similar: OrderedDict[tuple[str, ...], Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, q: str) -> Any | None:
+        key, sig = normalize_query(q), query_signature(q)
+        with self._lock:
+            if key in self._exact:
+                self._exact.move_to_end(key)
+                return self._exact[key]
+            if sig and sig in self._similar:
+                self._similar.move_to_end(sig)
+                value = self._similar[sig]
+                self._put(self._exact, key, value)
+                return value
+        return None
+
+    def set(self, q: str, value: Any) -> None:
+        key, sig = normalize_query(q), query_signature(q)
+        with self._lock:
+            self._put(self._exact, key, value)
+            if sig:
+                self._put(self._similar, sig, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._exact.clear()
+            self._similar.clear()
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def _put(self, store: OrderedDict, key, value) -> None:
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.maxsize:
+            store.popitem(last=False)
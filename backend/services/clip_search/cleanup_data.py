@@ -84,19 +84,20 @@ COLUMNS_TO_REMOVE = [
 
 
 def main():
-    df = pd.read_csv(RAW_CSV)
+    # Read the header first so dropped columns are never tokenized or converted
+    header = pd.read_csv(RAW_CSV, nrows=0).columns
+    cols_present = [c for c in COLUMNS_TO_REMOVE if c in header]
+    cols_missing = [c for c in COLUMNS_TO_REMOVE if c not in header]
+    if cols_missing:
+        print(f"Columns not in CSV (skipped): {cols_missing}")
+
+    removed = set(cols_present)
+    df = pd.read_csv(RAW_CSV, usecols=[c for c in header if c not in removed])
     original_rows = len(df)
 
     df = df[df["game_id"] == GAME_ID]
     filtered_rows = len(df)
 
-    cols_present = [c for c in COLUMNS_TO_REMOVE if c in df.columns]
-    cols_missing = [c for c in COLUMNS_TO_REMOVE if c not in df.columns]
-    if cols_missing:
-        print(f"Columns not in CSV (skipped): {cols_missing}")
-
-    df = df.drop(columns=cols_present, errors="ignore")
-
     df.to_csv(OUTPUT_CSV, index=False)
     print(f"Read {original_rows} rows, kept {filtered_rows} rows for {GAME_ID}")
     print(f"Removed {len(cols_present)} columns, wrote {OUTPUT_CSV}")
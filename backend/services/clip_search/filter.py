@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+import json
 from typing import Literal
 
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
 
 # ── Schema ──────────────────────────────────────────────────────────────────
@@ -39,12 +41,19 @@ class DrivePlayPosition(BaseModel):
     filters: FilterGroup
 
 
+def _empty_as_none(v):
+    """The LLM sometimes emits {} or [] for sections it means to leave out."""
+    return v or None
+
+
 class DriveFilter(BaseModel):
     include: FilterGroup | None = None
     include_min_count: int = 1
     exclude: FilterGroup | None = None
     play_at: DrivePlayPosition | None = None
 
+    _optional_sections = field_validator("include", "exclude", "play_at", mode="before")(_empty_as_none)
+
 
 class PlayQuery(BaseModel):
     """Top-level query — LLM picks the type."""
@@ -55,11 +64,42 @@ class PlayQuery(BaseModel):
     drive_filter: DriveFilter | None = None
     rank: RankFilter | None = None
 
+    _optional_sections = field_validator(
+        "filters", "anchor", "then", "drive_filter", "rank", mode="before"
+    )(_empty_as_none)
+
+
+def canonical_json(play_query: PlayQuery) -> str:
+    """PlayQuery as JSON with every group's conditions in a fixed order.
+
+    "and"/"or" are commutative, so queries that differ only in condition order
+    (as different phrasings often do) serialize identically.
+    """
+    def canonical(node):
+        if isinstance(node, dict):
+            node = {k: canonical(v) for k, v in node.items()}
+            if "logic" in node and "conditions" in node:
+                node["conditions"].sort(key=lambda c: json.dumps(c, sort_keys=True))
+            return node
+        if isinstance(node, list):
+            return [canonical(v) for v in node]
+        return node
+
+    return json.dumps(canonical(play_query.model_dump(mode="json")), sort_keys=True)
+
 
 # ── Filter application ─────────────────────────────────────────────────────
 
+# Operators that scan strings; in an "and" group they only see rows the
+# other conditions kept
+_SEARCH_OPS = frozenset({"contains", "not_contains"})
+
+
 def _apply_condition(df: pd.DataFrame, cond: FilterCondition) -> pd.Series:
-    col = df[cond.column]
+    return _column_condition(df[cond.column], cond)
+
+
+def _column_condition(col: pd.Series, cond: FilterCondition) -> pd.Series:
     op = cond.operator
     val = cond.value
 
@@ -69,7 +109,7 @@ def _apply_condition(df: pd.DataFrame, cond: FilterCondition) -> pd.Series:
         elif op == "neq":
             return col.notna()
         else:
-            return pd.Series(False, index=df.index)
+            return pd.Series(False, index=col.index)
 
     if op == "eq":
         return col == val
@@ -84,9 +124,9 @@ def _apply_condition(df: pd.DataFrame, cond: FilterCondition) -> pd.Series:
     elif op == "lte":
         return col <= val
     elif op == "contains":
-        return col.astype(str).str.contains(str(val), case=False, na=False)
+        return _contains(col, str(val))
     elif op == "not_contains":
-        return ~col.astype(str).str.contains(str(val), case=False, na=False)
+        return ~_contains(col, str(val))
     elif op == "isin":
         if not isinstance(val, list):
             val = [val]
@@ -95,30 +135,99 @@ def _apply_condition(df: pd.DataFrame, cond: FilterCondition) -> pd.Series:
         raise ValueError(f"Unknown operator: {op}")
 
 
+def _contains(col: pd.Series, pattern: str) -> pd.Series:
+    """Case-insensitive search; missing values never match."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # Search each distinct value once, then spread the answer by code (-1 = NaN)
+        hits = col.cat.categories.astype(str).str.contains(pattern, case=False)
+        return pd.Series(np.append(hits, False)[col.cat.codes.to_numpy()], index=col.index)
+    if not isinstance(col.dtype, pd.StringDtype):
+        col = col.astype(str)
+    # String columns are Arrow-backed, so this runs in Arrow's compute kernels
+    return col.str.contains(pattern, case=False, na=False)
+
+
+def _mask(df: pd.DataFrame, item: FilterCondition | FilterGroup) -> np.ndarray:
+    if isinstance(item, FilterGroup):
+        m = _apply_group(df, item)
+    else:
+        m = _apply_condition(df, item)
+    return m.to_numpy(dtype=bool, na_value=False)
+
+
+def _is_search(item: FilterCondition | FilterGroup) -> bool:
+    return isinstance(item, FilterCondition) and item.operator in _SEARCH_OPS
+
+
 def _apply_group(df: pd.DataFrame, group: FilterGroup) -> pd.Series:
+    if not group.conditions:
+        return pd.Series(True, index=df.index)
+
+    if group.logic == "and":
+        combined = _and_mask(df, group.conditions)
+    else:
+        combined = _or_mask(df, group.conditions)
+    return pd.Series(combined, index=df.index, copy=False)
+
+
+def _or_mask(df: pd.DataFrame, conditions: list[FilterCondition | FilterGroup]) -> np.ndarray:
+    """OR the conditions, scanning each column once for all its contains terms.
+
+    "sack or fumble or interception" on desc becomes one regex alternation.
+    """
+    searches: dict[str, list[str]] = {}
     masks = []
-    for item in group.conditions:
-        if isinstance(item, FilterGroup):
-            masks.append(_apply_group(df, item))
+    for item in conditions:
+        if isinstance(item, FilterCondition) and item.operator == "contains" and item.value is not None:
+            searches.setdefault(item.column, []).append(str(item.value))
         else:
-            masks.append(_apply_condition(df, item))
+            masks.append(_mask(df, item))
+    for column, patterns in searches.items():
+        pattern = patterns[0] if len(patterns) == 1 else "|".join(f"(?:{p})" for p in patterns)
+        masks.append(_contains(df[column], pattern).to_numpy(dtype=bool, na_value=False))
+    # One fused reduction over plain bool arrays instead of a Series op per mask
+    return np.logical_or.reduce(masks)
 
-    if not masks:
-        return pd.Series(True, index=df.index)
 
-    combined = masks[0]
-    for m in masks[1:]:
-        if group.logic == "and":
-            combined = combined & m
-        else:
-            combined = combined | m
+def _and_mask(df: pd.DataFrame, conditions: list[FilterCondition | FilterGroup]) -> np.ndarray:
+    """AND the conditions, running string searches only on rows the rest kept.
+
+    Comparisons are cheap over whole columns; a text search on `desc` is not,
+    so it gets just the surviving rows of its one column.
+    """
+    searches = [item for item in conditions if _is_search(item)]
+    others = [item for item in conditions if not _is_search(item)]
+
+    if others:
+        combined = np.logical_and.reduce([_mask(df, item) for item in others])
+    else:
+        combined = np.ones(len(df), dtype=bool)
+    if not searches:
+        return combined
+
+    rows = np.flatnonzero(combined)
+    for cond in searches:
+        if not len(rows):
+            break
+        hit = _column_condition(df[cond.column].take(rows), cond)
+        rows = rows[hit.to_numpy(dtype=bool, na_value=False)]
+    combined = np.zeros(len(df), dtype=bool)
+    combined[rows] = True
     return combined
 
 
-def apply_filters(df: pd.DataFrame, filter_group: FilterGroup) -> pd.DataFrame:
-    """Apply a FilterGroup to a DataFrame and return matching rows."""
-    mask = _apply_group(df, filter_group)
-    return df.loc[mask].reset_index(drop=True)
+def apply_filters(
+    df: pd.DataFrame, filter_group: FilterGroup, columns: list[str] | None = None
+) -> pd.DataFrame:
+    """Apply a FilterGroup to a DataFrame and return matching rows.
+
+    `columns`, if given, limits the returned (copied) columns to those the
+    caller reads; copying all ~300 columns dominates the cost otherwise.
+    """
+    rows = np.flatnonzero(_mask(df, filter_group))
+    if columns is not None:
+        df = df[columns]
+    return df.take(rows).reset_index(drop=True)
 
 
 # ── Rank pre-filter ───────────────────────────────────────────────────────
@@ -141,6 +250,23 @@ def apply_rank(df: pd.DataFrame, rank_filter: RankFilter) -> pd.DataFrame:
     return df[df.index.isin(ranked.index)]
 
 
+# ── Play ordering ─────────────────────────────────────────────────────────
+
+def _in_play_order(df: pd.DataFrame) -> pd.DataFrame:
+    """Return df sorted by (game_id, play_id) with a 0..N-1 index.
+
+    Callers usually pass data that is already in play order, so check that
+    first (one linear pass) and skip the sort + copy.
+    """
+    if df.index.equals(pd.RangeIndex(len(df))):
+        g = df["game_id"].to_numpy()
+        p = df["play_id"].to_numpy()
+        same_game = g[1:] == g[:-1]
+        if np.all((g[1:] > g[:-1]) | (same_game & (p[1:] >= p[:-1]))):
+            return df
+    return df.sort_values(["game_id", "play_id"]).reset_index(drop=True)
+
+
 # ── Sequence matching ─────────────────────────────────────────────────────
 
 def apply_sequence(
@@ -149,65 +275,70 @@ def apply_sequence(
     steps: list[SequenceStep],
 ) -> list[tuple[int, int]]:
     """Return (anchor_iloc, end_iloc) pairs for matched sequences."""
-    df = df.sort_values(["game_id", "play_id"]).reset_index(drop=True)
-    anchor_mask = _apply_group(df, anchor)
-    anchor_idxs = df.index[anchor_mask].tolist()
+    df = _in_play_order(df)
+    anchor_idxs = np.flatnonzero(_mask(df, anchor))
+    if not len(anchor_idxs):
+        # Also covers an empty frame, which has no drives to index below
+        return []
+    # Row-wise filters, so each step is evaluated once over the whole frame
+    step_masks = [_mask(df, step.filters) for step in steps]
+
+    # Drive number per row (-1 where drive is missing) and each drive's rows in play order
+    codes = df.groupby(["game_id", "drive"], sort=False).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    by_drive = np.argsort(codes, kind="stable")
+    drive_starts = np.searchsorted(codes[by_drive], np.arange(codes.max() + 2))
+    game_ids = df["game_id"].to_numpy()
+    drive_nums = df["drive"].to_numpy(dtype=float, na_value=np.nan)
+
+    def members(code: int) -> np.ndarray:
+        return by_drive[drive_starts[code]: drive_starts[code + 1]]
+
+    following: dict[int, int] = {}
+
+    def following_drive(i: int) -> int:
+        """Drive code of the first later-numbered play in row i's game, or -1."""
+        code = codes[i]
+        if code not in following:
+            later = np.flatnonzero((game_ids == game_ids[i]) & (drive_nums > drive_nums[i]))
+            following[code] = codes[later[0]] if len(later) else -1
+        return following[code]
 
     results: list[tuple[int, int]] = []
-    for a_idx in anchor_idxs:
-        a_row = df.iloc[a_idx]
+    for a_idx in anchor_idxs.tolist():
+        a_drive = codes[a_idx]
         cur_idx = a_idx
         matched = True
-        for step in steps:
+        for step, step_mask in zip(steps, step_masks):
             if step.scope == "next_play":
                 nxt = cur_idx + 1
-                if nxt >= len(df):
-                    matched = False
-                    break
-                nxt_row = df.iloc[nxt]
-                if nxt_row["game_id"] != a_row["game_id"]:
-                    matched = False
-                    break
-                if nxt_row["drive"] != a_row["drive"]:
-                    matched = False
-                    break
-                candidate = df.iloc[nxt: nxt + 1]
-                if candidate.empty or not _apply_group(candidate, step.filters).any():
+                if a_drive < 0 or nxt >= len(df) or codes[nxt] != a_drive or not step_mask[nxt]:
                     matched = False
                     break
                 cur_idx = nxt
 
             elif step.scope == "same_drive":
-                drive_plays = df[
-                    (df["game_id"] == a_row["game_id"])
-                    & (df["drive"] == a_row["drive"])
-                    & (df.index > cur_idx)
-                ]
-                if drive_plays.empty:
+                if a_drive < 0:
                     matched = False
                     break
-                step_mask = _apply_group(drive_plays, step.filters)
-                hits = drive_plays[step_mask]
-                if hits.empty:
+                drive_plays = members(a_drive)
+                later = drive_plays[drive_plays > cur_idx]
+                hits = later[step_mask[later]]
+                if not len(hits):
                     matched = False
                     break
-                cur_idx = hits.index[-1]
+                cur_idx = int(hits[-1])
 
             elif step.scope == "next_drive":
-                cur_drive = df.iloc[cur_idx]["drive"]
-                game_plays = df[df["game_id"] == a_row["game_id"]]
-                next_drives = game_plays[game_plays["drive"] > cur_drive]
-                if next_drives.empty:
+                nxt_drive = following_drive(cur_idx)
+                if nxt_drive < 0:
                     matched = False
                     break
-                next_drive_num = next_drives["drive"].iloc[0]
-                next_drive_plays = next_drives[next_drives["drive"] == next_drive_num]
-                step_mask = _apply_group(next_drive_plays, step.filters)
-                hits = next_drive_plays[step_mask]
-                if hits.empty:
+                drive_plays = members(nxt_drive)
+                hits = drive_plays[step_mask[drive_plays]]
+                if not len(hits):
                     matched = False
                     break
-                cur_idx = hits.index[-1]
+                cur_idx = int(hits[-1])
 
         if matched:
             results.append((a_idx, cur_idx))
@@ -221,29 +352,29 @@ def apply_drive_filter(
     df: pd.DataFrame, drive_filter: DriveFilter
 ) -> list[tuple[int, int]]:
     """Return (first_play_iloc, last_play_iloc) for each matching drive."""
-    df = df.sort_values(["game_id", "play_id"]).reset_index(drop=True)
+    df = _in_play_order(df)
     groups = df.groupby(["game_id", "drive"], sort=False)
-
-    results: list[tuple[int, int]] = []
-    for (_gid, _drv), grp in groups:
-        keep = True
-        if drive_filter.include is not None:
-            mask = _apply_group(grp, drive_filter.include)
-            if mask.sum() < drive_filter.include_min_count:
-                keep = False
-        if keep and drive_filter.play_at is not None:
-            pos = drive_filter.play_at.position - 1
-            if pos >= len(grp):
-                keep = False
-            else:
-                row_df = grp.iloc[pos: pos + 1]
-                if not _apply_group(row_df, drive_filter.play_at.filters).any():
-                    keep = False
-        if keep and drive_filter.exclude is not None:
-            mask = _apply_group(grp, drive_filter.exclude)
-            if mask.any():
-                keep = False
-        if keep:
-            results.append((grp.index[0], grp.index[-1]))
-
-    return results
+    # Drive number per row in order of first appearance; -1 where drive is missing
+    codes = groups.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    n_drives = groups.ngroups
+    in_drive = codes >= 0
+
+    # Each filter is evaluated once over all plays, then tallied per drive
+    def per_drive(hits: np.ndarray) -> np.ndarray:
+        return np.bincount(codes[in_drive & hits], minlength=n_drives)
+
+    keep = np.ones(n_drives, dtype=bool)
+    if drive_filter.include is not None:
+        keep &= per_drive(_mask(df, drive_filter.include)) >= drive_filter.include_min_count
+    if drive_filter.play_at is not None:
+        at_pos = groups.cumcount().to_numpy() == drive_filter.play_at.position - 1
+        keep &= per_drive(at_pos & _mask(df, drive_filter.play_at.filters)) > 0
+    if drive_filter.exclude is not None:
+        keep &= per_drive(_mask(df, drive_filter.exclude)) == 0
+
+    rows = np.arange(len(df))
+    first = np.full(n_drives, len(df))
+    last = np.full(n_drives, -1)
+    np.minimum.at(first, codes[in_drive], rows[in_drive])
+    np.maximum.at(last, codes[in_drive], rows[in_drive])
+    return [(int(first[d]), int(last[d])) for d in np.flatnonzero(keep)]
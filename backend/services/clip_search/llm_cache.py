@@ -0,0 +1,62 @@
+"""Persistent exact-match cache for Claude responses, backed by SQLite."""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+from .cache import normalize_query
+
+# Shares the video index's cache directory (not committed to git)
+CACHE_FILE = Path(__file__).resolve().parent.parent.parent / ".cache" / "llm_responses.sqlite3"
+
+
+def response_key(*parts: str, query: str) -> bytes:
+    """SHA-256 over the call identity (model, prompt version, step) and the normalized query."""
+    q = normalize_query(unicodedata.normalize("NFC", query))
+    return hashlib.sha256("|".join([*parts, q]).encode()).digest()
+
+
+class ResponseCache:
+    """SQLite table of response text with least-recently-used eviction."""
+
+    def __init__(self, path: Path = CACHE_FILE, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the worker threads, serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key BLOB PRIMARY KEY, value TEXT NOT NULL, ts INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_ts ON responses (ts)")
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET ts = ? WHERE key = ?", (time.time_ns(), key))
+            return row[0]
+
+    def set(self, key: bytes, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, ts) VALUES (?, ?, ?)",
+                (key, value, time.time_ns()),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY ts DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
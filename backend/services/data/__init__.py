@@ -1,10 +1,12 @@
 """Shared data utilities for NFL play-by-play data."""
 
-from .loader import load_data, DATA_DIR
+from .loader import load_data, load_search_data, DATA_DIR, DATA_FILE
 from .columns import (
     Category,
     CATEGORIES,
     CATEGORY_MAP,
+    CATALOG_COLUMNS,
     get_category_summary,
+    get_column_catalog,
     get_columns_for_categories,
 )
@@ -1,7 +1,7 @@
 """Column category tree for NFL play-by-play data.
 
-Organizes ~314 columns into categories so the LLM can first pick relevant
-categories, then see only the columns it needs.
+Organizes ~314 columns into categories so the LLM can see them grouped by
+topic, with a one-line description of each group.
 """
 
 from dataclasses import dataclass, field
@@ -231,14 +231,24 @@ CATEGORIES: list[Category] = [
 ]
 
 CATEGORY_MAP: dict[str, Category] = {c.name: c for c in CATEGORIES}
+CATALOG_COLUMNS: frozenset[str] = frozenset(col for cat in CATEGORIES for col in cat.columns)
+
+# Prompt text built once at import; the category tree never changes at runtime
+CATEGORY_SUMMARY: str = "\n".join(f"- {cat.name}: {cat.description}" for cat in CATEGORIES)
+COLUMN_CATALOG: str = "\n".join(
+    f"- {cat.name}: {cat.description}\n  columns: {', '.join(cat.columns)}"
+    for cat in CATEGORIES
+)
 
 
 def get_category_summary() -> str:
     """One-line-per-category summary for the LLM to pick from."""
-    lines = []
-    for cat in CATEGORIES:
-        lines.append(f"- {cat.name}: {cat.description}")
-    return "\n".join(lines)
+    return CATEGORY_SUMMARY
+
+
+def get_column_catalog() -> str:
+    """Every category with its description and columns, for a single-call prompt."""
+    return COLUMN_CATALOG
 
 
 def get_columns_for_categories(names: list[str]) -> list[str]:
@@ -1,12 +1,52 @@
 """Data loading utilities."""
 
+from __future__ import annotations
+
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
 
 DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+DATA_FILE = DATA_DIR / "niners_lions_play_by_play_2023.csv"
+
+# Low-cardinality labels stored as categoricals in clip search's frame: smaller,
+# and equality/isin filters compare integer codes instead of strings. Only
+# columns that are never range-compared belong here (ordering an unordered
+# categorical raises). The game analyst's generated code gets plain strings,
+# since idioms like fillna("none") or string concatenation fail on categoricals.
+CATEGORICAL_COLUMNS = [
+    "home_team", "away_team", "posteam", "defteam", "side_of_field",
+    "posteam_type", "season_type", "game_half", "play_type",
+    "pass_length", "pass_location", "run_location", "run_gap",
+    "field_goal_result", "extra_point_result", "two_point_conv_result",
+    "td_team", "penalty_team", "return_team", "timeout_team",
+    "roof", "surface",
+]
 
 
+@lru_cache(maxsize=1)
 def load_data() -> pd.DataFrame:
-    csv_path = DATA_DIR / "niners_lions_play_by_play_2023.csv"
-    return pd.read_csv(csv_path, low_memory=False)
+    """Play-by-play data in (game_id, play_id) order, parsed once per process.
+
+    Shared by every caller — treat as read-only and copy before mutating.
+    """
+    # Deferred so importing services.data (e.g. for the column catalog) stays light
+    import pandas as pd
+
+    df = pd.read_csv(DATA_FILE, low_memory=False)
+    # Play order, once: clip search relies on it and callers can skip re-sorting.
+    # (nflverse lists some timeouts before the play they precede in play_id.)
+    return df.sort_values(["game_id", "play_id"], kind="mergesort", ignore_index=True)
+
+
+@lru_cache(maxsize=1)
+def load_search_data() -> pd.DataFrame:
+    """load_data() with CATEGORICAL_COLUMNS as categoricals, for clip search's filters.
+
+    Shared and read-only like load_data().
+    """
+    df = load_data()
+    return df.astype({c: "category" for c in CATEGORICAL_COLUMNS if c in df.columns})
@@ -1,3 +1,3 @@
 """Game analyst — conversational NFL chatbot."""
 
-from .agent import chat
+from .agent import chat, chat_stream, preload
@@ -2,31 +2,84 @@
 
 from __future__ import annotations
 
-import re
 import logging
-
-import anthropic
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterator
 
 from services.data import load_data, get_category_summary
-from .executor import execute_query
+from .executor import _ALLOWED_IMPORTS, _SAFE_BUILTINS, execute_query, start_workers
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
-client = anthropic.Anthropic()
 MODEL = "claude-sonnet-4-20250514"
-
-
-def _build_game_summary() -> str:
+# Condenses old turns of long conversations
+SUMMARY_MODEL = "claude-3-5-haiku-20241022"
+# Once a session passes MAX_HISTORY messages, all but the last KEEP_RECENT
+# are folded into one summary message so each turn re-sends a bounded prompt
+MAX_HISTORY = 40
+KEEP_RECENT = 20
+
+
+# Key columns the LLM should use (exact names), listed in the game summary
+_KEY_COLUMNS = ", ".join([
+    "qtr", "down", "ydstogo", "yardline_100", "time", "desc", "play_type",
+    "yards_gained", "passing_yards", "rushing_yards", "air_yards", "yards_after_catch",
+    "passer_player_name", "receiver_player_name", "rusher_player_name",
+    "posteam", "defteam", "posteam_score", "defteam_score",
+    "touchdown", "pass_touchdown", "rush_touchdown", "td_player_name",
+    "interception", "fumble", "fumble_lost", "sack",
+    "pass_attempt", "complete_pass", "rush_attempt",
+    "first_down", "third_down_converted", "fourth_down_converted",
+    "field_goal_attempt", "field_goal_result", "kick_distance",
+    "penalty", "penalty_team", "penalty_type", "penalty_yards",
+    "wpa", "wp", "drive", "fixed_drive", "fixed_drive_result",
+    "home_team", "away_team", "total_home_score", "total_away_score",
+    "shotgun", "no_huddle", "qb_dropback",
+])
+
+
+@lru_cache(maxsize=1)
+def _client():
+    """Anthropic client, created on first use: the SDK takes ~1s to import."""
+    import anthropic
+
+    return anthropic.Anthropic()  # uses ANTHROPIC_API_KEY env var
+
+
+def _sums_by_player(plays: pd.DataFrame, player_column: str, sums: dict[str, str]) -> dict[str, dict]:
+    """{player: {"plays": n, stat: int total, ...}} in first-seen order, from one groupby.
+
+    `sums` maps stat name to source column; stats whose column is missing are left out.
+    """
+    present = {name: (col, "sum") for name, col in sums.items() if col in plays.columns}
+    agg = plays.groupby(player_column, sort=False).agg(plays=(player_column, "size"), **present)
+    return agg.astype(int).to_dict("index")
+
+
+def _first_value(df: pd.DataFrame, column: str):
+    """First non-missing value of a column, or "?", without copying it through dropna()."""
+    if column not in df.columns:
+        return "?"
+    idx = df[column].first_valid_index()
+    return df[column].loc[idx] if idx is not None else "?"
+
+
+def _build_game_summary(df: pd.DataFrame) -> str:
     """Build a concise statistical summary of the loaded game from the DataFrame."""
     try:
-        df = load_data()
-
-        home = df["home_team"].dropna().iloc[0] if "home_team" in df.columns else "?"
-        away = df["away_team"].dropna().iloc[0] if "away_team" in df.columns else "?"
-        date = df["game_date"].dropna().iloc[0] if "game_date" in df.columns else "?"
+        home = _first_value(df, "home_team")
+        away = _first_value(df, "away_team")
+        date = _first_value(df, "game_date")
 
-        home_score = int(df["total_home_score"].dropna().max()) if "total_home_score" in df.columns else "?"
-        away_score = int(df["total_away_score"].dropna().max()) if "total_away_score" in df.columns else "?"
+        # max() already skips NaN
+        home_score = int(df["total_home_score"].max()) if "total_home_score" in df.columns else "?"
+        away_score = int(df["total_away_score"].max()) if "total_away_score" in df.columns else "?"
 
         parts = [
             f"Game: {away} @ {home} on {date}",
@@ -57,36 +110,35 @@ def _build_game_summary() -> str:
                 td_players = tds["td_player_name"].dropna().unique().tolist()
                 if td_players:
                     parts.append(f"TD scorers: {', '.join(td_players)}")
-            # Per-team TD breakdown
+            # Per-team TD breakdown, one groupby pass in first-seen order
             if "posteam" in tds.columns:
-                for team in tds["posteam"].dropna().unique():
-                    team_tds = tds[tds["posteam"] == team]
+                for team, team_tds in tds.groupby("posteam", sort=False, observed=True):
                     scorers = team_tds["td_player_name"].dropna().tolist() if "td_player_name" in team_tds.columns else []
                     parts.append(f"  {team} TDs ({len(team_tds)}): {', '.join(scorers) if scorers else 'N/A'}")
 
         # Passing stats per passer
         if "passer_player_name" in df.columns and "passing_yards" in df.columns:
             pass_plays = df[df["pass_attempt"] == 1] if "pass_attempt" in df.columns else df[df["passer_player_name"].notna()]
-            for passer in pass_plays["passer_player_name"].dropna().unique():
-                p = pass_plays[pass_plays["passer_player_name"] == passer]
-                completions = int(p["complete_pass"].sum()) if "complete_pass" in p.columns else "?"
-                attempts = len(p)
-                yards = int(p["passing_yards"].sum())
-                p_tds = int(p["pass_touchdown"].sum()) if "pass_touchdown" in p.columns else 0
-                p_ints = int(p["interception"].sum()) if "interception" in p.columns else 0
-                parts.append(f"  {passer}: {completions}/{attempts}, {yards} yds, {p_tds} TD, {p_ints} INT")
+            stats = _sums_by_player(pass_plays, "passer_player_name", {
+                "yards": "passing_yards", "completions": "complete_pass",
+                "tds": "pass_touchdown", "ints": "interception",
+            })
+            for passer, p in stats.items():
+                parts.append(
+                    f"  {passer}: {p.get('completions', '?')}/{p['plays']}, {p['yards']} yds, "
+                    f"{p.get('tds', 0)} TD, {p.get('ints', 0)} INT"
+                )
 
         # Rushing stats per rusher (top rushers)
         if "rusher_player_name" in df.columns and "rushing_yards" in df.columns:
             rush_plays = df[df["rush_attempt"] == 1] if "rush_attempt" in df.columns else df[df["rusher_player_name"].notna()]
-            for rusher in rush_plays["rusher_player_name"].dropna().unique():
-                r = rush_plays[rush_plays["rusher_player_name"] == rusher]
-                carries = len(r)
-                if carries < 2:
+            stats = _sums_by_player(rush_plays, "rusher_player_name", {
+                "yards": "rushing_yards", "tds": "rush_touchdown",
+            })
+            for rusher, r in stats.items():
+                if r["plays"] < 2:
                     continue
-                yards = int(r["rushing_yards"].sum())
-                r_tds = int(r["rush_touchdown"].sum()) if "rush_touchdown" in r.columns else 0
-                parts.append(f"  {rusher}: {carries} carries, {yards} yds, {r_tds} TD")
+                parts.append(f"  {rusher}: {r['plays']} carries, {r['yards']} yds, {r.get('tds', 0)} TD")
 
         # Turnovers
         if "interception" in df.columns:
@@ -101,23 +153,7 @@ def _build_game_summary() -> str:
             quarters = sorted(df["qtr"].dropna().unique().tolist())
             parts.append(f"Quarters played: {', '.join(str(int(q)) for q in quarters)}")
 
-        # Key columns the LLM should use (exact names)
-        key_cols = [
-            "qtr", "down", "ydstogo", "yardline_100", "time", "desc", "play_type",
-            "yards_gained", "passing_yards", "rushing_yards", "air_yards", "yards_after_catch",
-            "passer_player_name", "receiver_player_name", "rusher_player_name",
-            "posteam", "defteam", "posteam_score", "defteam_score",
-            "touchdown", "pass_touchdown", "rush_touchdown", "td_player_name",
-            "interception", "fumble", "fumble_lost", "sack",
-            "pass_attempt", "complete_pass", "rush_attempt",
-            "first_down", "third_down_converted", "fourth_down_converted",
-            "field_goal_attempt", "field_goal_result", "kick_distance",
-            "penalty", "penalty_team", "penalty_type", "penalty_yards",
-            "wpa", "wp", "drive", "fixed_drive", "fixed_drive_result",
-            "home_team", "away_team", "total_home_score", "total_away_score",
-            "shotgun", "no_huddle", "qb_dropback",
-        ]
-        parts.append(f"\nKey column names (use these exact names): {', '.join(key_cols)}")
+        parts.append(f"\nKey column names (use these exact names): {_KEY_COLUMNS}")
 
         # Sample row so LLM sees data format
         sample = df[df["play_type"].isin(["pass", "run"])].head(1)
@@ -138,15 +174,25 @@ def _build_game_summary() -> str:
         return "(Game summary unavailable)"
 
 
-# Cache it once on first import
-_game_summary: str | None = None
+# (frame, summary) for the frame load_data last returned; rebuilt only if
+# load_data's cache is cleared and it hands back a different frame
+_game_summary: tuple[pd.DataFrame, str] | None = None
 
 
 def _get_game_summary() -> str:
     global _game_summary
-    if _game_summary is None:
-        _game_summary = _build_game_summary()
-    return _game_summary
+    df = load_data()
+    cached = _game_summary
+    if cached is None or cached[0] is not df:
+        cached = _game_summary = (df, _build_game_summary(df))
+    return cached[1]
+
+
+def preload() -> None:
+    """Build the cached game summary, Anthropic client and code workers ahead of the first chat."""
+    _get_game_summary()
+    _client()
+    start_workers()
 
 
 SYSTEM_PROMPT = """\
@@ -163,8 +209,9 @@ Here is a summary of the current game data you have access to:
 {game_summary}
 
 When the user asks a question that requires specific data lookups or statistics, \
-write Python/pandas code to answer it. Put the code in a ```python code block. \
-The code MUST assign its final answer to a variable called `result`.
+call the run_pandas tool with Python/pandas code that answers it. \
+The code MUST assign its final answer to a variable called `result`. \
+If the code fails, fix it or answer from the game summary instead.
 
 Available column categories:
 {categories}
@@ -177,7 +224,7 @@ Important notes:
 - For touchdowns, check the "touchdown" column (1 = TD) and "td_player_name" for who scored
 
 When you don't need data analysis (e.g. general football questions), just \
-answer directly without code. You know the game details from the summary above—use \
+answer directly without the tool. You know the game details from the summary above—use \
 that knowledge to give direct, informed answers when possible.
 
 Keep responses concise and conversational. Do NOT include raw code or data in your \
@@ -185,6 +232,12 @@ final answer to the user—always summarize findings in natural language. \
 NEVER say you cannot show video or clips—the app handles that.
 """
 
+@lru_cache(maxsize=1)
+def _system_prompt(game_summary: str) -> str:
+    """SYSTEM_PROMPT filled in, formatted once per game summary."""
+    return SYSTEM_PROMPT.format(categories=get_category_summary(), game_summary=game_summary)
+
+
 GAME_CONTEXT_PROMPT = """\
 The user has selected this game in the app: "{game_context}". \
 ALL questions are about this specific game. The data you have is ONLY from this game. \
@@ -195,83 +248,151 @@ about this game.
 """
 
 
-# In-memory session store: session_id -> list of message dicts
-_sessions: dict[str, list[dict]] = {}
+# In-memory session store: session_id -> (last used, list of message dicts),
+# least recently used first. Idle sessions expire; the oldest go past MAX_SESSIONS.
+_sessions: OrderedDict[str, tuple[float, list[dict]]] = OrderedDict()
+_sessions_lock = threading.Lock()
+SESSION_TTL_SECONDS = 3600
+MAX_SESSIONS = 10_000
 
 
 def _get_session(session_id: str) -> list[dict]:
-    if session_id not in _sessions:
-        _sessions[session_id] = []
-    return _sessions[session_id]
+    now = time.monotonic()
+    with _sessions_lock:
+        entry = _sessions.pop(session_id, None)
+        history = entry[1] if entry and now - entry[0] < SESSION_TTL_SECONDS else []
+        _sessions[session_id] = (now, history)
+        # Expired sessions collect at the front, so eviction stops at the first live one
+        while _sessions:
+            oldest_id, (last_used, _) = next(iter(_sessions.items()))
+            if len(_sessions) <= MAX_SESSIONS and now - last_used < SESSION_TTL_SECONDS:
+                break
+            del _sessions[oldest_id]
+    return history
+
+
+def _trim_history(history: list[dict]) -> None:
+    """Replace all but the last KEEP_RECENT messages with a short summary, in place."""
+    if len(history) <= MAX_HISTORY:
+        return
+    old, recent = history[:-KEEP_RECENT], history[-KEEP_RECENT:]
+    transcript = "\n\n".join(f"{m['role'].title()}: {m['content']}" for m in old)
+    try:
+        response = _client().messages.create(
+            model=SUMMARY_MODEL,
+            max_tokens=256,
+            system=(
+                "Summarize this conversation about an NFL game in a few sentences. "
+                "Keep the questions asked and the key facts and numbers in the answers."
+            ),
+            messages=[{"role": "user", "content": transcript}],
+        )
+        summary = response.content[0].text
+    except Exception as e:
+        # Losing old context beats failing the user's turn; dropping the leading
+        # assistant turn too keeps the history starting on a user message
+        logger.warning("Failed to summarize history, dropping oldest messages: %s", e)
+        history[:] = recent[1:]
+        return
+    # `recent` starts with an assistant turn (history ends on the new user
+    # message and KEEP_RECENT is even), so a user-role summary keeps roles alternating
+    history[:] = [{"role": "user", "content": f"[Earlier conversation, summarized: {summary}]"}, *recent]
+
+
+# The model calls this instead of writing code into its reply, so a data
+# question costs one round trip per lookup rather than reply + summary calls
+RUN_PANDAS_TOOL = {
+    "name": "run_pandas",
+    "description": (
+        "Run Python/pandas code against the play-by-play DataFrame `df` (pandas is `pd`, numpy is `np`). "
+        "The code must assign its answer to `result`; its string form is returned. "
+        "Only these builtins exist: " + ", ".join(sorted(n for n in _SAFE_BUILTINS if not n.startswith("_"))) + ". "
+        "Importable modules: " + ", ".join(sorted(_ALLOWED_IMPORTS)) + "."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {"code": {"type": "string", "description": "Code that sets `result`."}},
+        "required": ["code"],
+    },
+}
+# Tool calls allowed per message before the model must answer from what it has
+MAX_TOOL_ROUNDS = 3
 
 
 def chat(session_id: str, message: str, game_context: str | None = None) -> str:
     """Process a chat message and return the assistant's response."""
+    return "".join(chat_stream(session_id, message, game_context))
+
+
+def chat_stream(session_id: str, message: str, game_context: str | None = None) -> Iterator[str]:
+    """Process a chat message, yielding the response text as Claude generates it."""
     history = _get_session(session_id)
-    history.append({"role": "user", "content": message})
-
-    system = SYSTEM_PROMPT.format(
-        categories=get_category_summary(),
-        game_summary=_get_game_summary(),
-    )
-    if game_context:
-        system = system + "\n\n" + GAME_CONTEXT_PROMPT.format(game_context=game_context)
-
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=2048,
-        system=system,
-        messages=history,
-    )
-
-    assistant_text = response.content[0].text
-
-    # Check for python code block
-    code_match = re.search(r"```python\n(.*?)```", assistant_text, re.DOTALL)
-    if code_match:
-        code = code_match.group(1).strip()
-        df = load_data()
-        query_result = execute_query(code, df)
-
-        # If code execution errored, try to answer without code
-        if query_result.startswith("Error executing code:"):
-            logger.warning("Code execution failed: %s", query_result)
-            # Retry without code - ask Claude to just answer from the game summary
-            retry_response = client.messages.create(
+    turn = {"role": "user", "content": message}
+    history.append(turn)
+    answer: list[str] = []
+    try:
+        _trim_history(history)
+
+        # The prompt with the game summary is the same for every turn, so it is a
+        # cached prefix; the per-request game context goes in a block after it
+        system = [
+            {
+                "type": "text",
+                "text": _system_prompt(_get_game_summary()),
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+        if game_context:
+            system.append({"type": "text", "text": GAME_CONTEXT_PROMPT.format(game_context=game_context)})
+
+        # Tool calls and results stay in this turn; the session keeps only the text
+        messages = list(history)
+        for round_ in range(MAX_TOOL_ROUNDS + 1):
+            if answer and not answer[-1].endswith("\n"):
+                # Keep text from before a tool call apart from what follows it
+                answer.append("\n\n")
+                yield "\n\n"
+            with _client().messages.stream(
                 model=MODEL,
-                max_tokens=1024,
-                system=(
-                    "You are an NFL analyst. The data query failed. Answer the user's "
-                    "question as best you can using this game context:\n\n"
-                    f"{_get_game_summary()}"
-                ),
-                messages=[
-                    {"role": "user", "content": message},
-                ],
-            )
-            final_answer = retry_response.content[0].text
-            history.append({"role": "assistant", "content": final_answer})
-            return final_answer
-
-        # Ask Claude to summarize the result
-        game_ctx = game_context or "the selected game"
-        summary_response = client.messages.create(
-            model=MODEL,
-            max_tokens=1024,
-            system=(
-                f"You are an NFL analyst. The data is from one specific game: {game_ctx}. "
-                "Summarize the data result concisely for the user. "
-                "Use natural language, not code or raw data. Be direct and confident. "
-                "NEVER hedge about which game or timeframe—all data is from this one game. "
-                "Do NOT offer to look up more info or ask if the user wants details."
-            ),
-            messages=[
-                {"role": "user", "content": f"Question: {message}\n\nData result:\n{query_result}"},
-            ],
-        )
-        final_answer = summary_response.content[0].text
-        history.append({"role": "assistant", "content": final_answer})
-        return final_answer
-
-    history.append({"role": "assistant", "content": assistant_text})
-    return assistant_text
+                max_tokens=2048,
+                system=system,
+                messages=messages,
+                tools=[RUN_PANDAS_TOOL],
+                # Out of rounds: answer now
+                tool_choice={"type": "auto" if round_ < MAX_TOOL_ROUNDS else "none"},
+            ) as stream:
+                for text in stream.text_stream:
+                    answer.append(text)
+                    yield text
+                response = stream.get_final_message()
+            if response.stop_reason != "tool_use":
+                break
+            results = [_run_tool(block) for block in response.content if block.type == "tool_use"]
+            messages.append({"role": "assistant", "content": response.content})
+            messages.append({"role": "user", "content": results})
+    finally:
+        # Also runs if the caller stops reading early, so the turn is never left unanswered
+        text = "".join(answer).strip()
+        if text:
+            history.append({"role": "assistant", "content": text})
+        else:
+            # Nothing to keep (e.g. the API call failed): drop the question
+            # rather than store an empty assistant turn the API would reject
+            _drop_turn(history, turn)
+
+
+def _drop_turn(history: list[dict], turn: dict) -> None:
+    """Remove one message from a session's history, matched by identity."""
+    for i in range(len(history) - 1, -1, -1):
+        if history[i] is turn:
+            del history[i]
+            return
+
+
+def _run_tool(block) -> dict:
+    """Execute one run_pandas call and wrap the outcome as a tool_result block."""
+    query_result = execute_query(block.input.get("code", ""))
+    is_error = query_result.startswith("Error executing code:")
+    if is_error:
+        logger.warning("Code execution failed: %s", query_result)
+    return {"type": "tool_result", "tool_use_id": block.id, "content": query_result, "is_error": is_error}
@@ -2,16 +2,197 @@
 
 from __future__ import annotations
 
+import builtins
+import multiprocessing
+import queue
+import resource
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
+# Limits for one piece of generated code. CPU time is enforced inside the
+# worker (it is killed on overrun); wall time by the caller.
+TIMEOUT_SECONDS = 5
+MEMORY_LIMIT_BYTES = 2 << 30
+MAX_RESULT_CHARS = 8192
+# Frames and Series are cut to this many rows / columns before formatting
+MAX_RESULT_ROWS = 50
+MAX_RESULT_COLS = 20
+WORKERS = 2
+
+# Code runs in worker processes so a runaway loop or allocation can't take
+# down (or stall) the API process. Each worker is its own spawned process
+# (not forked: the server is threaded), so one stuck job can be killed
+# without touching code other sessions are running.
+_idle: queue.Queue = queue.Queue()
+_started = 0
+_workers_lock = threading.Lock()
+
+# Modules generated code may import; it already has pd, np and df
+_ALLOWED_IMPORTS = frozenset({"pandas", "numpy", "math", "re", "datetime", "collections"})
+
+
+def _safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name.split(".")[0] not in _ALLOWED_IMPORTS:
+        raise ImportError(f"import of {name!r} is not allowed")
+    return __import__(name, globals, locals, fromlist, level)
+
+
+def _safe_getattr(obj, name, *default):
+    # Dunder lookups are how sandboxed code reaches object.__subclasses__ and friends
+    if isinstance(name, str) and name.startswith("__"):
+        raise AttributeError(f"access to {name!r} is not allowed")
+    return getattr(obj, name, *default)
+
+
+# The only builtins generated code sees: no open, eval, exec, input, exit, ...
+_SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in (
+        "abs", "all", "any", "bool", "dict", "divmod", "enumerate", "filter", "float",
+        "int", "isinstance", "len", "list", "map", "max", "min", "range", "reversed",
+        "round", "set", "sorted", "str", "sum", "tuple", "zip",
+        "type", "hasattr", "next", "iter", "repr", "format", "pow", "frozenset", "slice",
+        "Exception", "KeyError", "IndexError", "ValueError", "TypeError",
+        "AttributeError", "ZeroDivisionError", "StopIteration",
+    )
+}
+_SAFE_BUILTINS["print"] = lambda *args, **kwargs: None
+_SAFE_BUILTINS["__import__"] = _safe_import
+_SAFE_BUILTINS["getattr"] = _safe_getattr
+
+# Recent results by code text. Workers load the data once and it never
+# changes while they run, so the same code always gives the same answer.
+_results: OrderedDict[str, str] = OrderedDict()
+_results_lock = threading.Lock()
+MAX_CACHED_RESULTS = 512
+
+# Each worker's own play-by-play frame, loaded once when it starts
+_worker_df: pd.DataFrame | None = None
+
+
+def _init_worker() -> None:
+    global _worker_df
+    resource.setrlimit(resource.RLIMIT_AS, (MEMORY_LIMIT_BYTES, MEMORY_LIMIT_BYTES))
+    from services.data import load_data
+
+    _worker_df = load_data()
+
+
+def _worker_main(conn) -> None:
+    _init_worker()
+    conn.send("ready")
+    while True:
+        conn.send(_run(conn.recv()))
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe."""
+
+    def __init__(self):
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
 
-def execute_query(code: str, df: pd.DataFrame) -> str:
+    def wait_ready(self) -> None:
+        """Block until the worker has loaded the data (not counted against a job's time)."""
+        if not self.ready:
+            self.conn.recv()
+            self.ready = True
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def _start_missing_workers() -> None:
+    global _started
+    with _workers_lock:
+        while _started < WORKERS:
+            _idle.put(_Worker())
+            _started += 1
+
+
+def start_workers() -> None:
+    """Start the worker processes now; each takes a few seconds to import pandas and load data."""
+    _start_missing_workers()
+
+
+def _replace(worker: _Worker) -> None:
+    """Kill a stuck or dead worker; a fresh one takes its place."""
+    global _started
+    worker.kill()
+    with _workers_lock:
+        _started -= 1
+    _start_missing_workers()
+
+
+def execute_query(code: str) -> str:
+    """Execute pandas code against the play-by-play data and return the result as a string."""
+    with _results_lock:
+        if code in _results:
+            _results.move_to_end(code)
+            return _results[code]
+
+    _start_missing_workers()
+    # Waiting for a free worker doesn't count against the code's time limit
+    worker = _idle.get()
+    try:
+        worker.wait_ready()
+        worker.conn.send(code)
+        if not worker.conn.poll(TIMEOUT_SECONDS):
+            _replace(worker)
+            return f"Error executing code: timed out after {TIMEOUT_SECONDS}s"
+        result = worker.conn.recv()
+    except (EOFError, OSError):
+        # The worker died, e.g. killed for going over its CPU limit
+        _replace(worker)
+        return "Error executing code: the worker running it was killed (CPU or memory limit)"
+    _idle.put(worker)
+
+    with _results_lock:
+        _results[code] = result
+        while len(_results) > MAX_CACHED_RESULTS:
+            _results.popitem(last=False)
+    return result
+
+
+def _run(code: str) -> str:
+    # RLIMIT_CPU counts the worker's whole life, so allow TIMEOUT_SECONDS more than used so far
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (int(usage.ru_utime + usage.ru_stime) + TIMEOUT_SECONDS, hard))
+    # Generated code may assign to df; keep the worker's frame clean
+    return _execute(code, _worker_df.copy())
+
+
+def _execute(code: str, df: pd.DataFrame) -> str:
     """Execute pandas code in a restricted namespace and return the result as a string."""
-    namespace = {"pd": pd, "df": df}
+    namespace = {"__builtins__": _SAFE_BUILTINS, "pd": pd, "np": np, "df": df}
     try:
         exec(code, namespace)
         if "result" in namespace:
-            return str(namespace["result"])
+            return _format_result(namespace["result"])[:MAX_RESULT_CHARS]
         return "(No 'result' variable set by code)"
     except Exception as e:
-        return f"Error executing code: {e}"
+        # Type included: some errors (e.g. MemoryError) have no message
+        return f"Error executing code: {type(e).__name__}: {e}"
+
+
+def _format_result(result) -> str:
+    """String form of a result, formatting at most MAX_RESULT_ROWS rows of a frame or Series."""
+    if not isinstance(result, (pd.DataFrame, pd.Series)):
+        return str(result)
+    note = ""
+    if len(result) > MAX_RESULT_ROWS:
+        note = f"[truncated to {MAX_RESULT_ROWS} rows of {len(result)}]\n"
+        result = result.head(MAX_RESULT_ROWS)
+    if isinstance(result, pd.DataFrame):
+        return note + result.to_string(max_cols=MAX_RESULT_COLS, max_colwidth=120)
+    return note + result.to_string()
@@ -3,9 +3,9 @@ def __getattr__(name):
     if name in ("VideoIndexer", "VideoIndex", "GameClock"):
         from . import indexer
         return getattr(indexer, name)
-    if name == "get_clips":
-        from .service import get_clips
-        return get_clips
+    if name in ("get_clip", "get_clips", "get_indexer", "close_indexers"):
+        from . import service
+        return getattr(service, name)
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = ["VideoIndexer", "VideoIndex", "GameClock", "get_clips"]
+__all__ = ["VideoIndexer", "VideoIndex", "GameClock", "get_clip", "get_clips", "get_indexer", "close_indexers"]
@@ -11,11 +11,15 @@ Two modes:
 
 from __future__ import annotations
 
+import bisect
 import cv2
 import json
 import logging
+import math
 import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass
 from dotenv import load_dotenv
@@ -24,6 +28,55 @@ from google.genai import types
 
 logger = logging.getLogger(__name__)
 
+# Frame reads this far ahead of the capture's position decode forward instead
+# of seeking (a seek decodes from the previous keyframe anyway)
+MAX_GRAB_SECONDS = 5.0
+# Scoreboard crops are shrunk to this width before encoding: half of a 1080p
+# frame, which still leaves the clock digits ~15px tall
+SCOREBOARD_MAX_WIDTH = 960
+JPEG_QUALITY = 75
+# Concurrent Gemini requests per indexer when reading several frames at once
+GEMINI_WORKERS = 8
+
+# Sent with every frame; kept byte-identical across calls
+CLOCK_PROMPT = """Look at this NFL game broadcast frame.
+
+Your task: Find and read the game clock display.
+
+The game clock typically shows:
+- The quarter (1st, 2nd, 3rd, 4th, or OT)
+- The time remaining in the quarter (MM:SS format, counting down from 15:00)
+
+If you can clearly see the game clock, respond with ONLY this exact format:
+QUARTER: <number 1-4, or 5 for overtime>
+TIME: <minutes>:<seconds>
+
+Examples of valid responses:
+QUARTER: 2
+TIME: 8:34
+
+QUARTER: 4
+TIME: 0:23
+
+If the game clock is NOT visible (commercial, replay without clock, halftime show, etc.), respond with:
+NO_CLOCK_VISIBLE
+
+Be precise. Only report what you can clearly read."""
+
+# Fields of a clock reply
+_QUARTER_RE = re.compile(r"QUARTER:\s*(\d+)")
+_TIME_RE = re.compile(r"TIME:\s*(\d+):(\d+)")
+
+# Asked once per video, on a frame known to show the clock
+SCOREBOARD_BOX_PROMPT = """Find the on-screen scoreboard graphic in this NFL broadcast frame that shows the game clock.
+
+Respond with ONLY its bounding box as [ymin, xmin, ymax, xmax], normalized to 0-1000.
+If there is no scoreboard with a game clock, respond with:
+NO_CLOCK_VISIBLE"""
+_BOX_RE = re.compile(r"\[\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\]")
+# Margin added around a located scoreboard on each side, as a fraction of its size
+SCOREBOARD_BOX_PADDING = 0.25
+
 # Load environment variables
 load_dotenv(Path(__file__).parent.parent.parent / ".env")
 
@@ -71,6 +124,12 @@ class VideoIndex:
         self.known_frames: dict[str, dict] = {}
         # Dead zones (no game clock visible): [[start, end], ...]
         self.dead_zones: list[list[float]] = []
+        # Scoreboard location in frame pixels, once found: [x, y, w, h]
+        self.scoreboard_box: list[int] | None = None
+        # Guards mutation/serialization when the index is shared across threads
+        self._lock = threading.RLock()
+        # Set by every mutation; save() only writes when there is something new
+        self._dirty = False
 
         self._load()
 
@@ -86,60 +145,94 @@ class VideoIndex:
                 self.quarters = {int(k): v for k, v in data.get("quarters", {}).items()}
                 self.mappings = data.get("mappings", {})
                 self.known_frames = data.get("known_frames", {})
-                self.dead_zones = data.get("dead_zones", [])
+                self.dead_zones = sorted(data.get("dead_zones", []), key=lambda z: z[0])
+                self.scoreboard_box = data.get("scoreboard_box")
 
     def save(self):
-        with open(self._cache_path, "w") as f:
+        """Write the index to its cache file if it changed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._write()
+            self._dirty = False
+
+    def _write(self):
+        # Written beside the cache and renamed over it, so a crash mid-write
+        # leaves the previous index intact
+        tmp_path = self._cache_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
             json.dump({
                 "video_path": self.video_path,
                 "quarters": self.quarters,
                 "mappings": self.mappings,
                 "known_frames": self.known_frames,
                 "dead_zones": self.dead_zones,
-            }, f, indent=2)
+                "scoreboard_box": self.scoreboard_box,
+            }, f, separators=(",", ":"))
+        os.replace(tmp_path, self._cache_path)
+
+    def clear(self):
+        """Drop all cached readings and quarter boundaries, and persist the empty index."""
+        with self._lock:
+            self.quarters = {}
+            self.mappings = {}
+            self.known_frames = {}
+            self.dead_zones = []
+            self.scoreboard_box = None
+            self._dirty = True
+            self.save()
 
     def add_known_frame(self, vod_seconds: float, quarter: int, game_time: str):
         """Record a successful frame reading."""
-        self.known_frames[str(round(vod_seconds, 1))] = {
-            "quarter": quarter,
-            "time": game_time
-        }
+        with self._lock:
+            self.known_frames[str(round(vod_seconds, 1))] = {
+                "quarter": quarter,
+                "time": game_time
+            }
+            self._dirty = True
 
     def add_dead_zone(self, start: float, end: float):
         """Record a VOD range with no game clock."""
-        # Merge with existing zones if overlapping
-        new_zone = [start, end]
-        merged = []
-        for zone in self.dead_zones:
-            if zone[1] < new_zone[0] - 10 or zone[0] > new_zone[1] + 10:
-                # No overlap
-                merged.append(zone)
-            else:
-                # Merge
-                new_zone = [min(zone[0], new_zone[0]), max(zone[1], new_zone[1])]
-        merged.append(new_zone)
-        self.dead_zones = sorted(merged, key=lambda z: z[0])
+        # Zones are sorted and disjoint, so the ones to merge (within 10s of
+        # the new range) are a contiguous run found by bisection
+        with self._lock:
+            zones = self.dead_zones
+            lo = bisect.bisect_left(zones, start - 10, key=lambda z: z[1])
+            hi = bisect.bisect_right(zones, end + 10, key=lambda z: z[0])
+            new_zone = [start, end]
+            if lo < hi:
+                new_zone = [min(start, zones[lo][0]), max(end, zones[hi - 1][1])]
+            self.dead_zones = zones[:lo] + [new_zone] + zones[hi:]
+            self._dirty = True
+
+    def dead_zone_at(self, vod_seconds: float) -> list[float] | None:
+        """The known dead zone containing a VOD timestamp, if any."""
+        zones = self.dead_zones
+        i = bisect.bisect_right(zones, vod_seconds, key=lambda z: z[0]) - 1
+        if i >= 0 and zones[i][1] >= vod_seconds:
+            return zones[i]
+        return None
 
     def is_in_dead_zone(self, vod_seconds: float) -> bool:
         """Check if a VOD timestamp is in a known dead zone."""
-        for start, end in self.dead_zones:
-            if start <= vod_seconds <= end:
-                return True
-        return False
+        return self.dead_zone_at(vod_seconds) is not None
 
     def get_nearest_known_frame(self, vod_seconds: float) -> tuple[float, dict] | None:
         """Find the nearest known frame reading to a VOD timestamp."""
-        if not self.known_frames:
-            return None
-        nearest = min(self.known_frames.keys(), key=lambda k: abs(float(k) - vod_seconds))
-        return (float(nearest), self.known_frames[nearest])
+        with self._lock:
+            if not self.known_frames:
+                return None
+            nearest = min(self.known_frames.keys(), key=lambda k: abs(float(k) - vod_seconds))
+            return (float(nearest), self.known_frames[nearest])
 
     @property
     def is_indexed(self) -> bool:
         return len(self.quarters) > 0
 
     def set_quarter_start(self, quarter: int, vod_seconds: float):
-        self.quarters[quarter] = vod_seconds
+        with self._lock:
+            self.quarters[quarter] = vod_seconds
+            self._dirty = True
 
     def get_quarter_start(self, quarter: int) -> float | None:
         return self.quarters.get(quarter)
@@ -160,6 +253,11 @@ class VideoIndex:
 
         return (start, end)
 
+    def set_scoreboard_box(self, box: list[int]):
+        with self._lock:
+            self.scoreboard_box = box
+            self._dirty = True
+
     def _make_key(self, quarter: int, game_time: str) -> str:
         return f"Q{quarter}_{game_time}"
 
@@ -167,28 +265,36 @@ class VideoIndex:
         return self.mappings.get(self._make_key(quarter, game_time))
 
     def set_mapping(self, quarter: int, game_time: str, vod_seconds: float):
-        self.mappings[self._make_key(quarter, game_time)] = vod_seconds
-        self.save()
+        with self._lock:
+            self.mappings[self._make_key(quarter, game_time)] = vod_seconds
+            self._dirty = True
 
     def get_nearby_mappings(self, quarter: int, game_time: str, tolerance_seconds: int = 60) -> list[tuple[str, float]]:
         """Get cached mappings near the target time for interpolation."""
-        target_parts = game_time.split(":")
-        target_total = int(target_parts[0]) * 60 + int(target_parts[1])
+        target_total = _game_seconds(game_time)
+
+        # Snapshot under the lock: other lookups may add mappings meanwhile
+        with self._lock:
+            mappings = list(self.mappings.items())
 
         nearby = []
         prefix = f"Q{quarter}_"
-        for key, vod_secs in self.mappings.items():
+        for key, vod_secs in mappings:
             if not key.startswith(prefix):
                 continue
             cached_time = key[len(prefix):]
-            parts = cached_time.split(":")
-            total = int(parts[0]) * 60 + int(parts[1])
-            if abs(total - target_total) <= tolerance_seconds:
-                nearby.append((cached_time, vod_secs))
+            diff = abs(_game_seconds(cached_time) - target_total)
+            if diff <= tolerance_seconds:
+                nearby.append((diff, cached_time, vod_secs))
+
+        nearby.sort(key=lambda x: x[0])
+        return [(cached_time, vod_secs) for _, cached_time, vod_secs in nearby]
 
-        return sorted(nearby, key=lambda x: abs(
-            int(x[0].split(":")[0]) * 60 + int(x[0].split(":")[1]) - target_total
-        ))
+
+def _game_seconds(game_time: str) -> int:
+    """Seconds left on a "M:SS" game clock."""
+    minutes, seconds = game_time.split(":")
+    return int(minutes) * 60 + int(seconds)
 
 
 class VideoIndexer:
@@ -208,6 +314,13 @@ class VideoIndexer:
         self.client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
         self.model_name = "gemini-3-flash-preview"
 
+        # The capture is seek-then-read, so frame reads must not interleave
+        self._cap_lock = threading.Lock()
+        # Only one auto_index scan at a time per indexer
+        self._auto_index_lock = threading.Lock()
+        # Gemini calls are network-bound; frames are still decoded one at a time
+        self._executor = ThreadPoolExecutor(max_workers=GEMINI_WORKERS, thread_name_prefix="clock-read")
+
         # Video properties
         self._cap = None
         self._fps = None
@@ -241,68 +354,132 @@ class VideoIndexer:
             self._duration = self.total_frames / self.fps
         return self._duration
 
-    def extract_frame(self, vod_seconds: float) -> bytes:
-        """Extract a frame from the video at the given VOD timestamp."""
+    def _decode_at(self, vod_seconds: float):
+        """Decode the frame at vod_seconds (caller holds _cap_lock); None if it can't be read.
+
+        Seeking decodes forward from the previous keyframe, so a target a little
+        ahead of the current position is reached by grabbing frames instead.
+        """
         frame_number = int(vod_seconds * self.fps)
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        position = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if not 0 <= frame_number - position <= MAX_GRAB_SECONDS * self.fps:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            position = frame_number
+        while position < frame_number:
+            if not self.cap.grab():
+                return None
+            position += 1
         ret, frame = self.cap.read()
-        if not ret:
-            raise ValueError(f"Could not read frame at {vod_seconds}s")
+        return frame if ret else None
 
-        # Crop to scoreboard region (top ~12% of frame)
+    def _encode_scoreboard(self, frame) -> bytes:
+        """Crop a decoded frame to the scoreboard, shrink it and encode it as JPEG."""
         frame = self._crop_scoreboard(frame)
-
-        # Encode as JPEG
-        _, buffer = cv2.imencode(".jpg", frame)
+        h, w = frame.shape[:2]
+        if w > SCOREBOARD_MAX_WIDTH:
+            size = (SCOREBOARD_MAX_WIDTH, max(1, round(h * SCOREBOARD_MAX_WIDTH / w)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
         return buffer.tobytes()
 
+    def extract_frame(self, vod_seconds: float) -> bytes:
+        """Extract a frame from the video at the given VOD timestamp."""
+        with self._cap_lock:
+            frame = self._decode_at(vod_seconds)
+        if frame is None:
+            raise ValueError(f"Could not read frame at {vod_seconds}s")
+        return self._encode_scoreboard(frame)
+
+    def extract_frames(self, vod_times: list[float]) -> list[bytes | None]:
+        """Extract frames at several timestamps (None where unreadable), decoding in time order."""
+        frames: list[bytes | None] = [None] * len(vod_times)
+        with self._cap_lock:
+            for i in sorted(range(len(vod_times)), key=vod_times.__getitem__):
+                # Encoded straight away so only one full-size frame is held at a time
+                try:
+                    frame = self._decode_at(vod_times[i])
+                    if frame is not None:
+                        frames[i] = self._encode_scoreboard(frame)
+                except Exception as e:
+                    logger.debug("Frame extract failed at %.1fs: %s", vod_times[i], e)
+        return frames
+
     def _crop_scoreboard(self, frame):
-        """Crop frame to bottom 25% where the scoreboard overlay lives."""
+        """Crop frame to the located scoreboard, or to the bottom 25% where it lives until then."""
+        box = self.index.scoreboard_box
+        if box:
+            x, y, w, h = box
+            return frame[y:y + h, x:x + w]
+        return self._bottom_band(frame)
+
+    @staticmethod
+    def _bottom_band(frame):
         h = frame.shape[0]
         return frame[int(h * 0.75):, :]
 
-    def read_game_clock(self, frame_bytes: bytes) -> GameClock | None:
-        """Use Gemini Vision to read the game clock from a frame."""
-        prompt = """Look at this NFL game broadcast frame.
-
-Your task: Find and read the game clock display.
-
-The game clock typically shows:
-- The quarter (1st, 2nd, 3rd, 4th, or OT)
-- The time remaining in the quarter (MM:SS format, counting down from 15:00)
-
-If you can clearly see the game clock, respond with ONLY this exact format:
-QUARTER: <number 1-4, or 5 for overtime>
-TIME: <minutes>:<seconds>
-
-Examples of valid responses:
-QUARTER: 2
-TIME: 8:34
-
-QUARTER: 4
-TIME: 0:23
+    def locate_scoreboard(self, vod_seconds: float) -> list[int] | None:
+        """
+        Ask Gemini where the scoreboard is in the frame at vod_seconds and save
+        it (padded) to the index, so later frames are cropped to just that.
+        """
+        with self._cap_lock:
+            frame = self._decode_at(vod_seconds)
+        if frame is None:
+            return None
+        band = self._bottom_band(frame)
+        _, buffer = cv2.imencode(".jpg", band)
 
-If the game clock is NOT visible (commercial, replay without clock, halftime show, etc.), respond with:
-NO_CLOCK_VISIBLE
+        response = self.client.models.generate_content(
+            model=self.model_name,
+            contents=[
+                types.Part.from_bytes(data=buffer.tobytes(), mime_type="image/jpeg"),
+                SCOREBOARD_BOX_PROMPT
+            ]
+        )
+        match = _BOX_RE.search(response.text or "")
+        if not match:
+            return None
+        ymin, xmin, ymax, xmax = (int(v) / 1000 for v in match.groups())
+        if not (0 <= xmin < xmax <= 1 and 0 <= ymin < ymax <= 1):
+            return None
 
-Be precise. Only report what you can clearly read."""
+        # Box coordinates are relative to the band; pad and map onto the full frame
+        band_h, band_w = band.shape[:2]
+        pad_x = (xmax - xmin) * SCOREBOARD_BOX_PADDING
+        pad_y = (ymax - ymin) * SCOREBOARD_BOX_PADDING
+        x0 = int(max(0.0, xmin - pad_x) * band_w)
+        x1 = int(min(1.0, xmax + pad_x) * band_w)
+        y0 = int(max(0.0, ymin - pad_y) * band_h)
+        y1 = int(min(1.0, ymax + pad_y) * band_h)
+        box = [x0, frame.shape[0] - band_h + y0, x1 - x0, y1 - y0]
+
+        self.index.set_scoreboard_box(box)
+        self.index.save()
+        logger.info("Scoreboard located at %s (x, y, w, h)", box)
+        return box
 
+    def read_game_clock(self, frame_bytes: bytes) -> GameClock | None:
+        """Use Gemini Vision to read the game clock from a frame."""
         response = self.client.models.generate_content(
             model=self.model_name,
             contents=[
                 types.Part.from_bytes(data=frame_bytes, mime_type="image/jpeg"),
-                prompt
+                CLOCK_PROMPT
             ]
         )
 
-        text = response.text.strip()
+        return self._parse_clock(response.text)
+
+    @staticmethod
+    def _parse_clock(text: str) -> GameClock | None:
+        """Parse a QUARTER/TIME reply; None for NO_CLOCK_VISIBLE or anything unreadable."""
+        text = text.strip()
 
         if "NO_CLOCK_VISIBLE" in text:
             return None
 
-        # Parse the response
-        quarter_match = re.search(r"QUARTER:\s*(\d+)", text)
-        time_match = re.search(r"TIME:\s*(\d+):(\d+)", text)
+        quarter_match = _QUARTER_RE.search(text)
+        time_match = _TIME_RE.search(text)
 
         if quarter_match and time_match:
             return GameClock(
@@ -313,28 +490,98 @@ Be precise. Only report what you can clearly read."""
 
         return None
 
-    def read_clock_at(self, vod_seconds: float, retries: int = 3, offset_step: float = 2.0) -> GameClock | None:
-        """Read clock at a position, with retries at nearby frames if clock not visible."""
+    @staticmethod
+    def _retry_offsets(retries: int, offset_step: float) -> list[float]:
+        """Offsets tried by read_clock_at: the position itself, then alternating later/earlier frames."""
         offsets = [0]
         for i in range(1, retries):
             offsets.extend([i * offset_step, -i * offset_step])
+        return offsets
 
-        for offset in offsets:
-            try_time = vod_seconds + offset
-            if try_time < 0 or try_time > self.duration:
-                continue
+    def _read_one(self, try_time: float) -> GameClock | None:
+        """Read the clock from the single frame at try_time; None if out of range, unreadable or no clock."""
+        if try_time < 0 or try_time > self.duration:
+            return None
+        try:
+            frame = self.extract_frame(try_time)
+        except Exception as e:
+            logger.debug("Frame read failed at %.1fs: %s", try_time, e)
+            return None
+        return self._read_frame_clock(frame, try_time)
+
+    def _read_frame_clock(self, frame_bytes: bytes, vod_seconds: float) -> GameClock | None:
+        """read_game_clock, logging and swallowing model errors."""
+        try:
+            return self.read_game_clock(frame_bytes)
+        except Exception as e:
+            logger.debug("Clock read failed at %.1fs: %s", vod_seconds, e)
+            return None
 
-            try:
-                frame = self.extract_frame(try_time)
-                clock = self.read_game_clock(frame)
-                if clock:
-                    return clock
-            except Exception as e:
-                logger.debug("Frame read failed at %.1fs: %s", try_time, e)
-                continue
+    def _read_clocks(self, vod_times: list[float]) -> list[GameClock | None]:
+        """Read the clock at each in-range timestamp, with the model calls made concurrently."""
+        frames = self.extract_frames(vod_times)
+        futures = [
+            self._executor.submit(self._read_frame_clock, frame, t) if frame is not None else None
+            for t, frame in zip(vod_times, frames)
+        ]
+        return [f.result() if f is not None else None for f in futures]
 
+    def read_clock_at(self, vod_seconds: float, retries: int = 3, offset_step: float = 2.0) -> GameClock | None:
+        """Read clock at a position, with retries at nearby frames if clock not visible."""
+        reading = self.read_clock_near(vod_seconds, retries, offset_step)
+        return reading[1] if reading else None
+
+    def read_clock_near(self, vod_seconds: float, retries: int = 3, offset_step: float = 2.0) -> tuple[float, GameClock] | None:
+        """Like read_clock_at, but also returns the VOD time of the frame the clock was read from."""
+        clock = self._read_one(vod_seconds)
+        if clock:
+            return (vod_seconds, clock)
+        # The frame itself usually has a clock; only a miss pays for the retries,
+        # which are read together but still preferred in offset order
+        retry_times = [vod_seconds + offset for offset in self._retry_offsets(retries, offset_step)[1:]]
+        retry_times = [t for t in retry_times if 0 <= t <= self.duration]
+        for t, clock in zip(retry_times, self._read_clocks(retry_times)):
+            if clock:
+                return (t, clock)
         return None
 
+    def read_clocks_batch(self, vod_times: list[float], retries: int = 3, offset_step: float = 2.0) -> list[GameClock | None]:
+        """
+        Read the clock at many positions; element i is what read_clock_at(vod_times[i]) would return.
+
+        Every position's own frame is read first, and the nearby retry frames
+        are only read for the positions that came back without a clock. The
+        model calls within each pass run concurrently.
+        """
+        clocks: list[GameClock | None] = [None] * len(vod_times)
+        pending = list(range(len(vod_times)))
+        for offset in self._retry_offsets(retries, offset_step):
+            tries = [(i, vod_times[i] + offset) for i in pending]
+            tries = [(i, t) for i, t in tries if 0 <= t <= self.duration]
+            for (i, _), clock in zip(tries, self._read_clocks([t for _, t in tries])):
+                clocks[i] = clock
+            pending = [i for i in pending if clocks[i] is None]
+        return clocks
+
+    def _interpolate_from_mappings(self, quarter: int, game_time: str, window_seconds: int = 120) -> float | None:
+        """
+        Estimate the VOD time of a game time from the nearest cached mappings
+        on either side of it (within window_seconds of game clock), or None
+        if it isn't bracketed.
+        """
+        target_total = _game_seconds(game_time)
+        before = after = None  # (game_secs, vod) with more / less time left than the target
+        for cached_time, vod_secs in self.index.get_nearby_mappings(quarter, game_time, window_seconds):
+            game_secs = _game_seconds(cached_time)
+            if game_secs > target_total and before is None:
+                before = (game_secs, vod_secs)
+            elif game_secs < target_total and after is None:
+                after = (game_secs, vod_secs)
+        if before is None or after is None or after[1] <= before[1]:
+            return None
+        fraction = (before[0] - target_total) / (before[0] - after[0])
+        return before[1] + (after[1] - before[1]) * fraction
+
     def find_exact_time(
         self,
         target_quarter: int,
@@ -352,6 +599,20 @@ Be precise. Only report what you can clearly read."""
         target_parts = target_time.split(":")
         target_total = int(target_parts[0]) * 60 + int(target_parts[1])
 
+        # Fast path: cached mappings on both sides of the target pin it down,
+        # so one confirming read replaces the whole search
+        interpolated = self._interpolate_from_mappings(target_quarter, target_time)
+        if interpolated is not None:
+            reading = self.read_clock_near(interpolated, retries=2)
+            if reading and reading[1].quarter == target_quarter:
+                # A retry frame may be a couple of seconds off the estimate;
+                # record and return where the clock was actually read
+                read_at, clock = reading
+                self.index.add_known_frame(read_at, clock.quarter, clock.time_str)
+                if abs(clock.total_seconds - target_total) <= tolerance_seconds:
+                    logger.info("Interpolated Q%d %s → VOD %.1fs from cached mappings", target_quarter, target_time, read_at)
+                    return read_at
+
         # Collect readings as we go: [(vod_time, game_seconds), ...]
         readings: list[tuple[float, int, int]] = []  # (vod, quarter, game_secs)
 
@@ -368,6 +629,9 @@ Be precise. Only report what you can clearly read."""
             current_pos = max(search_start, min(search_end, current_pos))
         else:
             current_pos = (search_start + search_end) / 2
+        if interpolated is not None:
+            # Missed the tolerance, but still the best estimate available
+            current_pos = interpolated
 
         iterations = 0
         max_iterations = 15
@@ -380,11 +644,9 @@ Be precise. Only report what you can clearly read."""
             current_pos = max(0, min(self.duration, current_pos))
 
             # Skip known dead zones
-            if self.index.is_in_dead_zone(current_pos):
-                for zone_start, zone_end in self.index.dead_zones:
-                    if zone_start <= current_pos <= zone_end:
-                        current_pos = zone_end + 5
-                        break
+            dead_zone = self.index.dead_zone_at(current_pos)
+            if dead_zone:
+                current_pos = dead_zone[1] + 5
 
             clock = self.read_clock_at(current_pos, retries=2)
 
@@ -419,7 +681,6 @@ Be precise. Only report what you can clearly read."""
                     best_match = current_pos
 
                 if diff <= tolerance_seconds:
-                    self.index.save()
                     return current_pos
 
             # SMART JUMP: Calculate where target should be based on this reading
@@ -479,8 +740,6 @@ Be precise. Only report what you can clearly read."""
             current_pos = next_pos
             logger.debug("Next position: %.1fs", current_pos)
 
-        self.index.save()
-
         if best_match and best_diff <= 2:
             logger.info("Using closest match: %ds off target", best_diff)
             return best_match
@@ -504,6 +763,7 @@ Be precise. Only report what you can clearly read."""
             logger.info("Q%d start found at VOD %.1fs", quarter, start_vod)
 
         self.index.set_quarter_start(quarter, start_vod)
+        self.index.save()
 
     def create_manual_index(self, q1_start: float, q2_start: float, q3_start: float, q4_start: float):
         """Create index from rough manual estimates. Refines each to exact timestamps."""
@@ -533,13 +793,18 @@ Be precise. Only report what you can clearly read."""
         logger.info("Auto-indexing %s (%.1f min, sampling every %ds)", self.video_path, self.duration / 60, sample_interval)
 
         # Phase 1: Coarse scan to map out the video
-        samples: list[tuple[float, GameClock | None]] = []
-        t = 0
-        while t < self.duration:
-            clock = self.read_clock_at(t, retries=2)
-            samples.append((t, clock))
+        sample_times = list(range(0, math.ceil(self.duration), sample_interval))
+        samples = list(zip(sample_times, self.read_clocks_batch(sample_times, retries=2)))
+        for t, clock in samples:
             logger.info("Sample %.1f min → %s", t / 60, clock or "NO CLOCK")
-            t += sample_interval
+
+        # Crop the rest of the search to the scoreboard itself
+        first_clock = next((t for t, clock in samples if clock), None)
+        if self.index.scoreboard_box is None and first_clock is not None:
+            try:
+                self.locate_scoreboard(first_clock)
+            except Exception as e:
+                logger.warning("Could not locate scoreboard, keeping the bottom-band crop: %s", e)
 
         # Phase 2: Detect quarter boundaries from samples
         quarter_samples: dict[int, list[tuple[float, GameClock]]] = {}
@@ -583,6 +848,7 @@ Be precise. Only report what you can clearly read."""
             else:
                 logger.warning("Q%d: exact start not found, using rough estimate %.0fs", q, rough_start)
                 self.index.set_quarter_start(q, rough_start)
+            self.index.save()
 
         self.index.save()
 
@@ -590,6 +856,12 @@ Be precise. Only report what you can clearly read."""
             logger.info("Q%d starts at VOD %.1fs (%.1f min)", q, vod_secs, vod_secs / 60)
         logger.info("Index saved to %s", self.index._cache_path)
 
+    def ensure_indexed(self):
+        """Run auto_index unless quarter boundaries are already known."""
+        with self._auto_index_lock:
+            if not self.index.is_indexed:
+                self.auto_index()
+
     def find_vod_timestamp(self, quarter: int, game_time: str) -> float:
         """Find the VOD timestamp for a specific game time."""
         if not self.index.is_indexed:
@@ -612,10 +884,15 @@ Be precise. Only report what you can clearly read."""
         # Smart search using interpolation
         logger.info("Searching for Q%d %s in VOD range [%.0fs, %.0fs]", quarter, game_time, base_start, base_end)
 
-        vod_timestamp = self.find_exact_time(quarter, game_time, base_start, base_end)
+        try:
+            vod_timestamp = self.find_exact_time(quarter, game_time, base_start, base_end)
+            if vod_timestamp:
+                self.index.set_mapping(quarter, game_time, vod_timestamp)
+        finally:
+            # One write per lookup for the mapping and the readings behind it
+            self.index.save()
 
         if vod_timestamp:
-            self.index.set_mapping(quarter, game_time, vod_timestamp)
             logger.info("Found and cached: Q%d %s → VOD %.1fs", quarter, game_time, vod_timestamp)
             return vod_timestamp
 
@@ -623,10 +900,12 @@ Be precise. Only report what you can clearly read."""
 
 
     def close(self):
-        """Release video capture resources."""
-        if self._cap:
-            self._cap.release()
-            self._cap = None
+        """Release video capture resources. The capture reopens lazily if used again."""
+        self.index.save()
+        with self._cap_lock:
+            if self._cap:
+                self._cap.release()
+                self._cap = None
 
 
 def main():
@@ -6,6 +6,7 @@ Takes game timestamps and returns VOD clip timestamps.
 
 from pathlib import Path
 import sys
+import threading
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
@@ -32,6 +33,36 @@ TOUCHDOWN_BONUS = 25.0   # celebration + replay + XP setup
 TURNOVER_BONUS  = 15.0   # INT/fumble return + aftermath
 
 
+# One long-lived indexer per video: keeps the capture open and the cache loaded
+_indexers: dict[str, VideoIndexer] = {}
+_indexers_lock = threading.Lock()
+
+
+def get_indexer(video_path: str) -> VideoIndexer:
+    """Return the shared VideoIndexer for a video, creating it on first use."""
+    with _indexers_lock:
+        indexer = _indexers.get(video_path)
+        if indexer is None:
+            indexer = _indexers[video_path] = VideoIndexer(video_path)
+        return indexer
+
+
+def close_indexers():
+    """Release every shared indexer's video capture (e.g. on shutdown)."""
+    with _indexers_lock:
+        for indexer in _indexers.values():
+            indexer.close()
+        _indexers.clear()
+
+
+def _static_url(video_path: str) -> str | None:
+    """URL of a video under the API's /data static mount, or None if it lives elsewhere."""
+    parts = Path(video_path).parts
+    if not parts or parts[0] != "data":
+        return None
+    return "/" + "/".join(parts)
+
+
 def _get_clip_duration(play_data: dict) -> float:
     """Compute clip duration based on play type and event flags."""
     play_type = play_data.get("play_type") or ""
@@ -45,6 +76,47 @@ def _get_clip_duration(play_data: dict) -> float:
     return base
 
 
+def get_clip(
+    video_path: str,
+    ts: GameTimestamp,
+    play_buffer_seconds: float = 15.0,
+) -> ClipTimestamp:
+    """
+    Convert one game timestamp to a VOD clip. The video must already be indexed.
+    """
+    indexer = get_indexer(video_path)
+    pd = ts.play_data or {}
+    start = max(0, indexer.find_vod_timestamp(ts.quarter, ts.time) - PRE_PLAY_PADDING)
+    duration = _get_clip_duration(pd)
+    end = start + duration + play_buffer_seconds
+    return ClipTimestamp(
+        start_time=start,
+        end_time=end,
+        video_path=video_path,
+        video_url=_static_url(video_path),
+        description=pd.get("desc"),
+        play_type=pd.get("play_type"),
+        down=pd.get("down"),
+        ydstogo=pd.get("ydstogo"),
+        yards_gained=pd.get("yards_gained"),
+        posteam=pd.get("posteam"),
+        defteam=pd.get("defteam"),
+        quarter=ts.quarter,
+        game_time=ts.time,
+        posteam_score=pd.get("posteam_score"),
+        defteam_score=pd.get("defteam_score"),
+        passer=pd.get("passer_player_name"),
+        rusher=pd.get("rusher_player_name"),
+        receiver=pd.get("receiver_player_name"),
+        is_touchdown=pd.get("touchdown", False),
+        is_interception=pd.get("interception", False),
+        is_sack=pd.get("sack", False),
+        is_fumble=pd.get("fumble", False),
+        yardline_100=pd.get("yardline_100"),
+        wpa=pd.get("wpa"),
+    )
+
+
 def get_clips(
     video_path: str,
     timestamps: list[GameTimestamp],
@@ -53,48 +125,8 @@ def get_clips(
     """
     Convert game timestamps to VOD clip timestamps.
     """
-    indexer = VideoIndexer(video_path)
-
-    try:
-        if not indexer.index.is_indexed:
-            indexer.auto_index()
-
-        clips = []
-        for ts in timestamps:
-            start = max(0, indexer.find_vod_timestamp(ts.quarter, ts.time) - PRE_PLAY_PADDING)
-            duration = _get_clip_duration(pd)
-            end = start + duration + play_buffer_seconds
-            pd = ts.play_data or {}
-            clips.append(ClipTimestamp(
-                start_time=start,
-                end_time=end,
-                video_path=video_path,
-                description=pd.get("desc"),
-                play_type=pd.get("play_type"),
-                down=pd.get("down"),
-                ydstogo=pd.get("ydstogo"),
-                yards_gained=pd.get("yards_gained"),
-                posteam=pd.get("posteam"),
-                defteam=pd.get("defteam"),
-                quarter=ts.quarter,
-                game_time=ts.time,
-                posteam_score=pd.get("posteam_score"),
-                defteam_score=pd.get("defteam_score"),
-                passer=pd.get("passer_player_name"),
-                rusher=pd.get("rusher_player_name"),
-                receiver=pd.get("receiver_player_name"),
-                is_touchdown=pd.get("touchdown", False),
-                is_interception=pd.get("interception", False),
-                is_sack=pd.get("sack", False),
-                is_fumble=pd.get("fumble", False),
-                yardline_100=pd.get("yardline_100"),
-                wpa=pd.get("wpa"),
-            ))
-
-        return clips
-
-    finally:
-        indexer.close()
+    get_indexer(video_path).ensure_indexed()
+    return [get_clip(video_path, ts, play_buffer_seconds) for ts in timestamps]
 
 
 if __name__ == "__main__":
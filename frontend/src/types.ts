@@ -7,6 +7,7 @@ export interface ClipTimestamp {
   start_time: number;
   end_time?: number;
   video_path: string;
+  video_url?: string;
   description?: string;
   play_type?: string;
   down?: number;